@@ -1,6 +1,7 @@
 from asgiref.sync import sync_to_async
 from django.db import transaction
-from apps.directory.access import get_allowed_organizations
+from django.db.models import Q
+from apps.directory.access import get_org_scope
 from apps.directory.models import Department, Employee, Organization
 from apps.inventory.models import Equipment, EquipmentEvent, EquipmentEventType, EquipmentType
 from apps.users.models import User
@@ -11,12 +12,11 @@ def access_orgs_for_user(telegram_id):
     if not user:
         return None
 
-    orgs = get_allowed_organizations(user)
-
-    if user.is_superuser:
+    scope = get_org_scope(user)
+    if scope.is_all:
         return None
 
-    return list(orgs.values_list("id", flat=True))
+    return sorted(scope.org_ids)
 
     # admin_emp = Employee.objects.filter(telegram_id=telegram_id, is_admin=True, is_approved=True).first()
     # if not admin_emp:
@@ -79,7 +79,16 @@ def get_device_by_code_or_id(identifier):
             return equipment
     except (ValueError, TypeError):
         pass
-    return qs.filter(qr_token=identifier).first()
+    equipment = qs.filter(qr_token=identifier).first()
+    if equipment:
+        return equipment
+    # инвентарный/серийный номер — только точное и однозначное совпадение:
+    # нечёткий поиск показал бы чужое оборудование по любому слову
+    identifier = (identifier or "").strip()
+    if not identifier:
+        return None
+    matches = list(qs.filter(Q(inventory_number=identifier) | Q(serial_number=identifier))[:2])
+    return matches[0] if len(matches) == 1 else None
     # try:
     #     qr_id = int(identifier)
     #     qr = QRCode.objects.select_related('device__responsible', 'device__department', 'device__device_type').filter(id=qr_id, is_active=True).first()
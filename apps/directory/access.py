@@ -1,31 +1,98 @@
+from dataclasses import dataclass
+
+from django.core.cache import cache
+
 from .models import Organization
 
+ORG_SCOPE_CACHE_TIMEOUT = 60 * 60
 
-def get_allowed_organizations(user):
-    if user.is_superuser:
-        return Organization.objects.all()
 
-    access = getattr(user, "organization_access", None)
-    if not access:
-        return Organization.objects.none()
+@dataclass(frozen=True)
+class OrgScope:
+    """
+    Разрешённые пользователю организации: is_all для суперпользователя,
+    иначе неизменяемое множество id. Даёт простые IN (...) без подзапросов и DISTINCT.
+    """
+    is_all: bool
+    org_ids: frozenset = frozenset()
 
-    return access.organizations.all()
+    def allows(self, organization_id):
+        if self.is_all:
+            return True
+        try:
+            return int(organization_id) in self.org_ids
+        except (TypeError, ValueError):
+            return False
 
+    def filter(self, qs, field_name="organization"):
+        if self.is_all:
+            return qs
+        if not self.org_ids:
+            return qs.none()
+        return qs.filter(**{f"{field_name}__in": sorted(self.org_ids)})
 
-def filter_queryset_by_user_orgs(qs, user, field_name="organization"):
+    @property
+    def cache_key(self):
+        if self.is_all:
+            return "all"
+        return ",".join(str(i) for i in sorted(self.org_ids)) or "none"
+
+
+def _scope_cache_key(user_id):
+    return f"org-scope:{user_id}"
+
+
+def get_org_scope(user):
+    """
+    Область видимости пользователя. Кэшируется на объекте user (в пределах запроса)
+    и в общем кэше по user.pk; сбрасывается сигналами UserOrganizationAccess.
+    """
     if user.is_superuser:
-        return qs
+        return OrgScope(is_all=True)
+
+    scope = getattr(user, "_org_scope", None)
+    if scope is not None:
+        return scope
+
+    if not user.pk:
+        return OrgScope(is_all=False)
 
-    allowed_ids = get_allowed_organizations(user).values_list("id", flat=True)
-    return qs.filter(**{f"{field_name}__in": allowed_ids}).distinct()
+    key = _scope_cache_key(user.pk)
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(
+            Organization.objects
+            .filter(user_accesses__user_id=user.pk)
+            .values_list("id", flat=True)
+        )
+        cache.set(key, ids, ORG_SCOPE_CACHE_TIMEOUT)
+
+    scope = OrgScope(is_all=False, org_ids=frozenset(ids))
+    user._org_scope = scope
+    return scope
+
+
+def invalidate_org_scope(*user_ids):
+    cache.delete_many([_scope_cache_key(pk) for pk in user_ids if pk])
+
+
+def get_allowed_organizations(user):
+    scope = get_org_scope(user)
+    if scope.is_all:
+        return Organization.objects.all()
+    return scope.filter(Organization.objects.all(), "pk")
+
+
+def filter_queryset_by_user_orgs(qs, user, field_name="organization"):
+    return get_org_scope(user).filter(qs, field_name)
 
 
 def user_has_org_access(user, organization_id):
-    if user.is_superuser:
-        return True
+    return get_org_scope(user).allows(organization_id)
 
-    access = getattr(user, "organization_access", None)
-    if not access:
-        return False
 
-    return access.organizations.filter(pk=organization_id).exists()
\ No newline at end of file
+def org_scope_key(user):
+    """
+    Строковый ключ области видимости пользователя (для ключей кэша).
+    """
+    return get_org_scope(user).cache_key
@@ -5,3 +5,9 @@ class DirectoryConfig(AppConfig):
     name = 'apps.directory'
     label = 'directory'
     verbose_name = "Справочники"
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from apps.directory import signals
+
+        post_migrate.connect(signals.fill_normalized_fields, sender=self)
@@ -3,6 +3,7 @@ from django import forms
 from django.db import models
 from .filters_mixins import BootstrapFilterFormMixin
 from .models import Organization, Department, Employee
+from .normalize import normalize_search
 
 
 class EmployeeFilter(BootstrapFilterFormMixin, django_filters.FilterSet):
@@ -30,7 +31,7 @@ class EmployeeFilter(BootstrapFilterFormMixin, django_filters.FilterSet):
         if not value:
             return queryset
         return queryset.filter(
-            models.Q(full_name__icontains=value)
+            models.Q(full_name_norm__contains=normalize_search(value))
             | models.Q(email__icontains=value)
             | models.Q(phone__icontains=value)
         )
@@ -60,7 +61,7 @@ class OrganizationFilter(BootstrapFilterFormMixin, django_filters.FilterSet):
             return queryset
         return queryset.filter(
             models.Q(code__icontains=value) |
-            models.Q(name__icontains=value)
+            models.Q(name_norm__contains=normalize_search(value))
         )
 
     def filter_show_inactive(self, queryset, name, value):
@@ -98,7 +99,7 @@ class DepartmentFilter(BootstrapFilterFormMixin, django_filters.FilterSet):
         if not value:
             return queryset
         return queryset.filter(
-            models.Q(name__icontains=value)
-            | models.Q(organization__name__icontains=value)
+            models.Q(name_norm__contains=normalize_search(value))
+            | models.Q(organization__name_norm__contains=normalize_search(value))
             | models.Q(organization__code__icontains=value)
         )
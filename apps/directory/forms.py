@@ -1,6 +1,6 @@
 from django import forms
 from .models import Organization, Department, Employee
-from .access import get_allowed_organizations
+from .access import filter_queryset_by_user_orgs, get_allowed_organizations
 
 
 class OrganizationForm(forms.ModelForm):
@@ -62,7 +62,7 @@ class EmployeeForm(forms.ModelForm):
         if org_id:
             dept_qs = Department.objects.filter(organization_id=org_id)
             if user and not user.is_superuser:
-                dept_qs = dept_qs.filter(organization__in=allowed_orgs)
+                dept_qs = filter_queryset_by_user_orgs(dept_qs, user, "organization")
 
         self.fields["department"].queryset = dept_qs.order_by("name")
         self.fields["department"].empty_label = "— сначала выберите организацию —"
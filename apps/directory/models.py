@@ -1,16 +1,24 @@
 from django.db import models
 
+from apps.directory.normalize import PREFIX_OPCLASSES, NormalizedFieldsMixin
 from config import settings
 
 
-class Organization(models.Model):
+class Organization(NormalizedFieldsMixin, models.Model):
     code = models.CharField(max_length=3, unique=True)
     name = models.CharField(max_length=200, unique=True)
     active = models.BooleanField(default=True, verbose_name="Активна")
+    # нормализованное name для поиска (casefold, ё -> е)
+    name_norm = models.CharField(max_length=200, blank=True, editable=False)
+
+    normalized_fields = {"name_norm": "name"}
 
     class Meta:
         verbose_name = "Организация"
         verbose_name_plural = "Организации"
+        indexes = [
+            models.Index(fields=["name_norm"], name="directory_org_name_norm_idx", opclasses=PREFIX_OPCLASSES),
+        ]
         ordering = ["code"]
 
     def __str__(self):
@@ -39,28 +47,38 @@ class UserOrganizationAccess(models.Model):
         return self.user.get_username()
 
 
-class Department(models.Model):
+class Department(NormalizedFieldsMixin, models.Model):
     organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="departments")
     name = models.CharField(max_length=200)
     active = models.BooleanField(default=True, verbose_name="Активно")
+    name_norm = models.CharField(max_length=200, blank=True, editable=False)
+
+    normalized_fields = {"name_norm": "name"}
 
     class Meta:
         verbose_name = "Подразделение"
         verbose_name_plural = "Подразделения"
         unique_together = [("organization", "name")]
+        indexes = [
+            models.Index(fields=["organization", "name_norm"]),
+            models.Index(fields=["name_norm"], name="directory_dep_name_norm_idx", opclasses=PREFIX_OPCLASSES),
+        ]
         ordering = ["name"]
 
     def __str__(self):
         return f"{self.organization} / {self.name}"
 
 
-class Employee(models.Model):
+class Employee(NormalizedFieldsMixin, models.Model):
     organization = models.ForeignKey(Organization, on_delete=models.PROTECT, related_name="employees")
     department = models.ForeignKey(Department, on_delete=models.PROTECT, related_name="employees")
     full_name = models.CharField(max_length=200)
     email = models.EmailField(blank=True)
     phone = models.CharField(max_length=50, blank=True)
     active = models.BooleanField(default=True, verbose_name="Активен")
+    full_name_norm = models.CharField(max_length=200, blank=True, editable=False)
+
+    normalized_fields = {"full_name_norm": "full_name"}
 
     class Meta:
         verbose_name = "Сотрудник"
@@ -68,6 +86,8 @@ class Employee(models.Model):
         indexes = [
             models.Index(fields=["full_name"]),
             models.Index(fields=["organization", "department"]),
+            models.Index(fields=["organization", "full_name_norm"]),
+            models.Index(fields=["full_name_norm"], name="directory_emp_name_norm_idx", opclasses=PREFIX_OPCLASSES),
         ]
         ordering = ["full_name"]
 
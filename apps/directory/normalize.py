@@ -0,0 +1,110 @@
+from django.db.models import BooleanField, F, Lookup, Q
+
+# верхняя граница для диапазонного поиска по префиксу
+_PREFIX_END = "\U0010ffff"
+
+# pattern_ops-индекс под LIKE 'префикс%' в PostgreSQL (на других СУБД opclasses игнорируются)
+PREFIX_OPCLASSES = ["varchar_pattern_ops"]
+
+
+def normalize_search(value):
+    """
+    Нормализация строки для поиска: casefold (работает и для кириллицы), ё -> е,
+    схлопывание пробелов. Одинаково применяется к колонкам *_norm и к запросу.
+    """
+    value = (value or "").casefold().replace("ё", "е")
+    return " ".join(value.split())
+
+
+class NormPrefix(Lookup):
+    """
+    Префикс нормализованной колонки по индексу.
+    SQLite сравнивает строки побайтно — диапазон value <= field < value + U+10FFFF.
+    В PostgreSQL порядок задаёт collation базы, и под не-C collation такой диапазон
+    ненадёжен — там LIKE 'value%' по индексу с PREFIX_OPCLASSES.
+    """
+    lookup_name = "norm_prefix"
+    output_field = BooleanField()
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        lhs, params = self.process_lhs(compiler, connection)
+        return f"({lhs} >= %s AND {lhs} < %s)", [*params, self.rhs, self.rhs + _PREFIX_END]
+
+    def as_postgresql(self, compiler, connection):
+        lhs, params = self.process_lhs(compiler, connection)
+        return f"{lhs} LIKE %s", [*params, connection.ops.prep_for_like_query(self.rhs) + "%"]
+
+
+def prefix_q(field, value):
+    """Префиксный поиск по нормализованной колонке (см. NormPrefix)."""
+    return Q(NormPrefix(F(field), normalize_search(value)))
+
+
+class NormalizedFieldsMixin:
+    """
+    Поддерживает теневые колонки поиска: normalized_fields = {"name_norm": "name"}.
+    save() заполняет их сам; для bulk_create/bulk_update нужно вызвать
+    fill_normalized_fields() у каждого объекта.
+    """
+    normalized_fields = {}
+
+    def fill_normalized_fields(self):
+        for target, source in self.normalized_fields.items():
+            setattr(self, target, normalize_search(getattr(self, source)))
+
+    def save(self, *args, **kwargs):
+        self.fill_normalized_fields()
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            for target, source in self.normalized_fields.items():
+                if source in update_fields:
+                    update_fields.add(target)
+            kwargs["update_fields"] = update_fields
+
+        super().save(*args, **kwargs)
+
+
+def refresh_normalized_fields(queryset, batch_size=1000):
+    """
+    Пересчитывает теневые колонки для всех строк queryset (после добавления колонок
+    или массовых изменений в обход save()).
+    """
+    model = queryset.model
+    manager = model._default_manager.db_manager(queryset.db)
+    targets = list(model.normalized_fields)
+    sources = list(model.normalized_fields.values())
+
+    batch = []
+    for obj in queryset.only("pk", *sources).iterator(chunk_size=batch_size):
+        obj.fill_normalized_fields()
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            manager.bulk_update(batch, targets)
+            batch = []
+    if batch:
+        manager.bulk_update(batch, targets)
+
+
+def backfill_normalized_fields(model, using="default", apps=None):
+    """
+    Заполняет пустые теневые колонки у строк, созданных до их появления; вызывается
+    из post_migrate. Повторный вызов дёшев: выбираются только строки с пустым *_norm
+    при непустом источнике. apps — состояние миграций: если колонок в схеме ещё нет
+    (migrate на раннюю миграцию), ничего не делает.
+    """
+    if apps is not None:
+        try:
+            state = apps.get_model(model._meta.label)
+        except LookupError:
+            return
+        columns = {f.name for f in state._meta.get_fields()}
+        if not set(model.normalized_fields) <= columns:
+            return
+
+    q = Q()
+    for target, source in model.normalized_fields.items():
+        q |= Q(**{target: ""}) & ~Q(**{source: ""})
+    refresh_normalized_fields(model._default_manager.using(using).filter(q))
@@ -0,0 +1,52 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.directory.access import invalidate_org_scope
+from apps.directory.models import Department, Employee, Organization, UserOrganizationAccess
+from apps.directory.normalize import backfill_normalized_fields
+from config.counting import bump_count_version
+
+
+@receiver([post_save, post_delete], sender=Employee)
+@receiver([post_save, post_delete], sender=Department)
+@receiver([post_save, post_delete], sender=Organization)
+def directory_changed(sender, **kwargs):
+    bump_count_version(sender)
+
+
+@receiver(pre_save, sender=UserOrganizationAccess)
+def organization_access_reassigned(sender, instance, **kwargs):
+    # доступ передан другому пользователю — прежнему тоже нужно сбросить область
+    instance._previous_user_id = None
+    if instance.pk:
+        instance._previous_user_id = (
+            UserOrganizationAccess.objects.filter(pk=instance.pk).values_list("user_id", flat=True).first()
+        )
+
+
+@receiver([post_save, post_delete], sender=UserOrganizationAccess)
+def organization_access_changed(sender, instance, **kwargs):
+    invalidate_org_scope(instance.user_id, getattr(instance, "_previous_user_id", None))
+
+
+@receiver(m2m_changed, sender=UserOrganizationAccess.organizations.through)
+def organization_access_m2m_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith("post_"):
+            invalidate_org_scope(instance.user_id)
+        return
+
+    # со стороны Organization: instance — организация, pk_set — id доступов
+    if action == "pre_clear":
+        user_ids = instance.user_accesses.values_list("user_id", flat=True)
+    elif action in ("post_add", "post_remove"):
+        user_ids = UserOrganizationAccess.objects.filter(pk__in=pk_set).values_list("user_id", flat=True)
+    else:
+        return
+    invalidate_org_scope(*user_ids)
+
+
+def fill_normalized_fields(sender, using="default", apps=None, **kwargs):
+    # миграция добавляет колонки *_norm пустыми — заполняем после migrate
+    for model in (Organization, Department, Employee):
+        backfill_normalized_fields(model, using, apps)
@@ -24,5 +24,6 @@ path("employees/<int:pk>/unassign-all/", views.EmployeeUnassignAllView.as_view()
     path("departments/<int:pk>/toggle-active/", views.DepartmentToggleActiveView.as_view(), name="department_toggle_active"),
 
     path("ajax/departments/", views.DepartmentsByOrganizationView.as_view(), name="ajax_departments"),
+    path("ajax/organizations/", views.OrganizationsLookupView.as_view(), name="ajax_organizations"),
 
 ]
\ No newline at end of file
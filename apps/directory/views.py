@@ -1,7 +1,7 @@
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.db import transaction
-from django.db.models import Count
+from django.db.models import Count, Q
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy
@@ -9,16 +9,19 @@ from django.views import View
 from django.views.generic import CreateView, UpdateView, DetailView
 from django_filters.views import FilterView
 
-from config.pdf import render_pdf_response
+from config.counting import CachedCountMixin
+from config.widgets import remote_select_response
 from apps.directory.filters import EmployeeFilter, OrganizationFilter, DepartmentFilter
 from apps.directory.forms import OrganizationForm, DepartmentForm, EmployeeForm, EmployeeUnassignAllForm
 from apps.directory.models import Employee, Organization, Department
 from apps.inventory.models import Equipment, EquipmentEvent, EquipmentEventType, EquipmentStatus
+from apps.inventory.pdf_jobs import PdfJobMixin
 from apps.inventory.views import _append_query
-from apps.directory.access import filter_queryset_by_user_orgs, user_has_org_access
+from apps.directory.access import filter_queryset_by_user_orgs, get_allowed_organizations, user_has_org_access
+from apps.directory.normalize import normalize_search, prefix_q
 
 # Create your views here.
-class EmployeeListView(LoginRequiredMixin, PermissionRequiredMixin, FilterView):
+class EmployeeListView(LoginRequiredMixin, PermissionRequiredMixin, CachedCountMixin, FilterView):
     permission_required = "directory.view_employee"
     template_name = "directory/employee_list.html"
     model = Employee
@@ -188,17 +191,18 @@ class EmployeeToggleActiveView(LoginRequiredMixin, View):
         obj.save(update_fields=["active"])
         return redirect(request.POST.get("next") or request.META.get("HTTP_REFERER") or "/employees/")
 
-class EmployeeListPdfView(EmployeeListView):
+class EmployeeListPdfView(PdfJobMixin, EmployeeListView):
     permission_required = "directory.view_employee"
+    pdf_job_kind = "employee_list"
 
-    def get(self, request, *args, **kwargs):
+    def get_pdf_document(self):
         self.object_list = self.get_queryset()
         filt = self.get_filterset(self.filterset_class)
-        context = {"filter": filt, "request": request}
-        return render_pdf_response(request, "directory/pdf/employee_list_pdf.html", context, "employees.pdf")
+        context = {"filter": filt, "request": self.request}
+        return "directory/pdf/employee_list_pdf.html", context, "employees.pdf"
 
 
-class OrganizationListView(FilterView):
+class OrganizationListView(CachedCountMixin, FilterView):
     template_name = "directory/organization_list.html"
     filterset_class = OrganizationFilter
     paginate_by = 20
@@ -243,10 +247,12 @@ class OrganizationUpdateView(LoginRequiredMixin, UpdateView):
         return filter_queryset_by_user_orgs(Organization.objects.all(), self.request.user, "id")
 
 
-class DepartmentListView(LoginRequiredMixin, FilterView):
+class DepartmentListView(LoginRequiredMixin, CachedCountMixin, FilterView):
     template_name = "directory/department_list.html"
     filterset_class = DepartmentFilter
     paginate_by = 20
+    # поиск идёт и по названию/коду организации
+    count_models = (Department, Organization)
 
     def get_queryset(self):
         qs = (
@@ -273,13 +279,32 @@ class DepartmentsByOrganizationView(LoginRequiredMixin, View):
         qs = Department.objects.filter(organization_id=org_id, active=True)
 
         if q:
-            qs = qs.filter(name__icontains=q)
+            qs = qs.filter(prefix_q("name_norm", q))
 
         qs = qs.order_by("name")[:50]
 
         data = [{"id": d.id, "name": d.name} for d in qs]  # <-- без повторного order_by
         return JsonResponse({"results": data})
 
+class OrganizationsLookupView(LoginRequiredMixin, View):
+    """
+    Организации, доступные пользователю, для RemoteSelect: поиск по коду и названию.
+    """
+
+    def get(self, request):
+        q = (request.GET.get("q") or "").strip()
+        qs = get_allowed_organizations(request.user).order_by("code", "id")
+        if request.GET.get("active"):
+            qs = qs.filter(active=True)
+        if q:
+            # с OR по коду индекс по name_norm не используется — подстрока, как в фильтре списка
+            qs = qs.filter(Q(code__startswith=q) | Q(name_norm__contains=normalize_search(q)))
+        return remote_select_response(request, qs, lambda o: {
+            "id": o.id,
+            "name": str(o),
+        })
+
+
 class DepartmentCreateView(LoginRequiredMixin, CreateView):
     model = Department
     form_class = DepartmentForm
@@ -0,0 +1,73 @@
+"""
+Кэш PDF актов. Применённый документ (applied_at) со снимками строк не меняется,
+поэтому его PDF рендерится один раз и хранится в default_storage:
+acts/<id документа>/<хэш содержимого>.pdf. Хэш считается по всему, что попадает
+в шаблон, и по исходнику шаблона — при любом изменении путь другой.
+"""
+import hashlib
+import json
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.template.loader import get_template
+
+from config.pdf import render_pdf_bytes
+
+ACT_DIR = "acts"
+
+
+def act_template(doc):
+    """(шаблон, имя файла) для акта."""
+    if doc.doc_type == "transfer":
+        return "inventory/pdf/act_transfer.html", f"act-transfer-{doc.number}.pdf"
+    return "inventory/pdf/act_writeoff.html", f"act-writeoff-{doc.number}.pdf"
+
+
+def _template_source(template_name):
+    template = get_template(template_name)
+    return getattr(getattr(template, "template", None), "source", template_name)
+
+
+def act_content_hash(doc, template_name):
+    payload = {
+        "template": template_name,
+        "source": hashlib.sha1(_template_source(template_name).encode("utf-8")).hexdigest(),
+        "doc": [doc.doc_type, doc.number, str(doc.date), doc.comment, str(doc.applied_at)],
+        "organization": str(doc.organization),
+        "from": str(doc.from_employee or ""),
+        "to": str(doc.to_employee or ""),
+        "lines": [
+            [line.pk, line.name_snapshot, line.type_snapshot, line.inventory_number_snapshot]
+            for line in doc.lines.all()
+        ],
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def act_pdf_path(document_id, digest):
+    return f"{ACT_DIR}/{document_id}/{digest}.pdf"
+
+
+def ensure_act_pdf(doc, template_name, digest, request=None):
+    """
+    Возвращает путь к PDF в default_storage; рендерит только при отсутствии файла.
+    Старые версии этого документа при этом удаляются.
+    """
+    path = act_pdf_path(doc.pk, digest)
+    if default_storage.exists(path):
+        return path
+
+    pdf = render_pdf_bytes(template_name, {"doc": doc}, request=request)
+    invalidate_act_pdfs(doc.pk)
+    return default_storage.save(path, ContentFile(pdf))
+
+
+def invalidate_act_pdfs(document_id):
+    directory = f"{ACT_DIR}/{document_id}"
+    try:
+        _, files = default_storage.listdir(directory)
+    except (FileNotFoundError, NotImplementedError):
+        return
+    for name in files:
+        default_storage.delete(f"{directory}/{name}")
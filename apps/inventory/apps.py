@@ -5,3 +5,9 @@ class InventoryConfig(AppConfig):
     name = 'apps.inventory'
     label = 'inventory'
     verbose_name = 'Оборудование'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from apps.inventory import signals
+
+        post_migrate.connect(signals.create_search_index, sender=self)
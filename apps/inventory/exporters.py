@@ -0,0 +1,73 @@
+"""
+Выгрузка списка оборудования в CSV/TSV. Заголовки — те же, что в шаблоне импорта,
+так что выгруженный файл можно отредактировать и загрузить обратно.
+"""
+import csv
+
+from .models import EquipmentStatus, PrintMode
+
+# (поле импорта, заголовок, поле для values_list)
+EQUIPMENT_CSV_COLUMNS = (
+    ("organization_code", "Код организации", "organization__code"),
+    ("inventory_number", "Инвентарный номер", "inventory_number"),
+    ("name", "Наименование", "name"),
+    ("assigned_to", "Сотрудник", "assigned_to__full_name"),
+    ("department_name", "Подразделение", "assigned_to__department__name"),
+    ("equipment_type", "Тип", "equipment_type__name"),
+    ("serial_number", "Серийный номер", "serial_number"),
+    ("model", "Модель", "model"),
+    ("specs", "Характеристики", "specs"),
+    ("cpu", "Процессор", "cpu"),
+    ("ram_gb", "ОЗУ", "ram_gb"),
+    ("storageHDD_gb", "HDD", "storageHDD_gb"),
+    ("storageSDD_gb", "SSD", "storageSDD_gb"),
+    ("print_format", "Формат печати", "print_format"),
+    ("print_mode", "Тип печати", "print_mode"),
+    ("status", "Статус", "status"),
+    ("commissioning_date", "Дата поступления", "commissioning_date"),
+)
+
+EQUIPMENT_CSV_HEADERS = [header for _, header, _ in EQUIPMENT_CSV_COLUMNS]
+
+EXPORT_FORMATS = {
+    "csv": (";", "text/csv; charset=utf-8"),
+    "tsv": ("\t", "text/tab-separated-values; charset=utf-8"),
+}
+
+
+class _Echo:
+    """Псевдо-файл для csv.writer: writerow() возвращает готовую строку."""
+
+    def write(self, value):
+        return value
+
+
+def iter_equipment_csv(queryset, delimiter=";", chunk_size=2000):
+    """
+    Строки CSV по queryset оборудования. Читает values_list через iterator(chunk_size),
+    поэтому память не растёт с размером выгрузки; отдаёт текст порциями по chunk_size строк.
+    """
+    writer = csv.writer(_Echo(), delimiter=delimiter)
+    status_labels = dict(EquipmentStatus.choices)
+    print_mode_labels = dict(PrintMode.choices)
+    names = [name for name, _, _ in EQUIPMENT_CSV_COLUMNS]
+    status_idx = names.index("status")
+    print_mode_idx = names.index("print_mode")
+    date_idx = names.index("commissioning_date")
+
+    yield "\ufeff" + writer.writerow(EQUIPMENT_CSV_HEADERS)
+
+    rows = queryset.values_list(*(lookup for _, _, lookup in EQUIPMENT_CSV_COLUMNS))
+    buf = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        row = ["" if v is None else v for v in row]
+        row[status_idx] = status_labels.get(row[status_idx], row[status_idx])
+        row[print_mode_idx] = print_mode_labels.get(row[print_mode_idx], row[print_mode_idx])
+        if row[date_idx]:
+            row[date_idx] = row[date_idx].isoformat()
+        buf.append(writer.writerow(row))
+        if len(buf) >= chunk_size:
+            yield "".join(buf)
+            buf = []
+    if buf:
+        yield "".join(buf)
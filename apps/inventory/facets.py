@@ -0,0 +1,105 @@
+"""
+Фасетные счётчики для фильтра списка оборудования: сколько единиц по каждому
+статусу, типу и организации при текущем фильтре.
+
+Измерения без выбранного значения считаются одним запросом GROUP BY
+(status, equipment_type_id, organization_id); строк в результате не больше,
+чем сочетаний этих значений, суммы по каждому измерению собираются в Python.
+Измерение, по которому фильтр уже выбран, считается отдельным запросом по
+остальным фильтрам — иначе у всех вариантов, кроме выбранного, был бы 0.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django_filters.constants import EMPTY_VALUES
+
+from config.widgets import RemoteSelect
+
+# имя фильтра -> колонка группировки
+FACET_FIELDS = {
+    "status": "status",
+    "equipment_type": "equipment_type_id",
+    "organization": "organization_id",
+}
+
+
+def _group_counts(queryset, fields):
+    facets = {name: Counter() for name in fields}
+    rows = (
+        queryset.order_by()
+        .values(*fields.values())
+        .annotate(n=Count("pk"))
+    )
+    for row in rows:
+        for name, column in fields.items():
+            facets[name][row[column]] += row["n"]
+    return {name: dict(counts) for name, counts in facets.items()}
+
+
+def _selected_facets(filterset):
+    if filterset is None or not filterset.is_bound or not filterset.form.is_valid():
+        return set()
+    return {name for name in FACET_FIELDS if filterset.form.cleaned_data.get(name) not in EMPTY_VALUES}
+
+
+def _filter_without(filterset, skip):
+    """queryset фильтра со всеми значениями, кроме skip (как FilterSet.filter_queryset)."""
+    queryset = filterset.queryset
+    for name, value in filterset.form.cleaned_data.items():
+        if name != skip:
+            queryset = filterset.filters[name].filter(queryset, value)
+    return queryset
+
+
+def compute_facets(queryset, filterset=None):
+    """
+    {"status": {"in_use": 12, ...}, "equipment_type": {3: 40, ...}, "organization": {...}}
+    queryset — отфильтрованный список; filterset — его фильтр, по нему считаются
+    измерения с выбранным значением.
+    """
+    selected = _selected_facets(filterset)
+    facets = {}
+    rest = {name: column for name, column in FACET_FIELDS.items() if name not in selected}
+    if rest:
+        facets.update(_group_counts(queryset, rest))
+    for name in selected:
+        facets.update(_group_counts(_filter_without(filterset, name), {name: FACET_FIELDS[name]}))
+    return facets
+
+
+def get_facets(queryset, signature, filterset=None):
+    """
+    compute_facets с кэшем по подписи фильтра (см. CachedCountMixin.get_filter_signature).
+    """
+    key = f"list-facets:{signature}"
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(queryset, filterset)
+        cache.set(key, facets, getattr(settings, "LIST_COUNT_CACHE_TIMEOUT", 300))
+    return facets
+
+
+def apply_facet_labels(form, facets):
+    """
+    Дописывает " (N)" к вариантам выбора полей фильтра. Для RemoteSelect
+    счётчики дописывает remote-select.js из json "list-facets".
+    """
+    if "status" in form.fields and "status" in facets:
+        counts = facets["status"]
+        field = form.fields["status"]
+        field.choices = [
+            (value, f"{label} ({counts.get(value, 0)})" if value else label)
+            for value, label in field.choices
+        ]
+
+    for name in ("equipment_type", "organization"):
+        if name not in form.fields or name not in facets:
+            continue
+        if isinstance(form.fields[name].widget, RemoteSelect):
+            continue
+        counts = facets[name]
+        form.fields[name].label_from_instance = (
+            lambda obj, counts=counts: f"{obj} ({counts.get(obj.pk, 0)})"
+        )
@@ -1,9 +1,38 @@
 import django_filters
 from django import forms
-from django.db import models
+from django.db.models import F
+from django.urls import reverse_lazy
+
+from apps.directory.access import filter_queryset_by_user_orgs, get_allowed_organizations
 from apps.directory.models import Organization, Employee
+from config.widgets import RemoteSelect
 from .filters_mixins import BootstrapFilterFormMixin
 from .models import Equipment, EquipmentStatus, EquipmentType, PrintMode
+from .search import search_equipment
+
+
+AGE_CHOICES = [
+    ("lt3", "менее 3 лет"),
+    ("3", "3 года и более"),
+    ("5", "5 лет и более"),
+]
+
+SORT_CHOICES = [
+    ("age_desc", "Сначала старые"),
+    ("age_asc", "Сначала новые"),
+]
+
+
+def _allowed_organizations(request):
+    if request is None:
+        return Organization.objects.all()
+    return get_allowed_organizations(request.user)
+
+
+def _allowed_employees(request):
+    if request is None:
+        return Employee.objects.all()
+    return filter_queryset_by_user_orgs(Employee.objects.all(), request.user, "organization")
 
 
 class EquipmentFilter(BootstrapFilterFormMixin, django_filters.FilterSet):
@@ -15,8 +44,27 @@ class EquipmentFilter(BootstrapFilterFormMixin, django_filters.FilterSet):
 
     status = django_filters.ChoiceFilter(choices=EquipmentStatus.choices, label="Статус")
     equipment_type = django_filters.ModelChoiceFilter(queryset=EquipmentType.objects.all(), label="Тип")
-    organization = django_filters.ModelChoiceFilter(queryset=Organization.objects.all(), label="Организация")
-    assigned_to = django_filters.ModelChoiceFilter(queryset=Employee.objects.all(), label="Сотрудник")
+    # варианты организаций и сотрудников подгружаются по AJAX (RemoteSelect),
+    # queryset нужен только для проверки присланного pk
+    organization = django_filters.ModelChoiceFilter(
+        queryset=_allowed_organizations,
+        label="Организация",
+        widget=RemoteSelect(
+            reverse_lazy("directory:ajax_organizations"),
+            placeholder="Все организации",
+            attrs={"data-facet": "organization"},
+        ),
+    )
+    assigned_to = django_filters.ModelChoiceFilter(
+        queryset=_allowed_employees,
+        label="Сотрудник",
+        widget=RemoteSelect(
+            reverse_lazy("inventory:ajax_employees_by_org"),
+            depends_on="id_organization",
+            depends_param="organization_id",
+            placeholder="Все сотрудники",
+        ),
+    )
 
     commissioning_date__gte = django_filters.DateFilter(
         field_name="commissioning_date", lookup_expr="gte", label="Ввод с",
@@ -26,6 +74,9 @@ class EquipmentFilter(BootstrapFilterFormMixin, django_filters.FilterSet):
         field_name="commissioning_date", lookup_expr="lte", label="Ввод по",
         widget=forms.DateInput(attrs={"type": "date"})
     )
+    age = django_filters.ChoiceFilter(
+        choices=AGE_CHOICES, method="filter_age", label="Срок использования"
+    )
 
     # --- Компьютер ---
     cpu = django_filters.CharFilter(
@@ -50,6 +101,11 @@ class EquipmentFilter(BootstrapFilterFormMixin, django_filters.FilterSet):
         field_name="print_mode", choices=PrintMode.choices, label="Печать"
     )
 
+    # сортировка — последним фильтром, чтобы перекрыть порядок поиска
+    sort = django_filters.ChoiceFilter(
+        choices=SORT_CHOICES, method="sort_by", label="Сортировка", empty_label="По дате создания"
+    )
+
     class Meta:
         model = Equipment
         fields = [
@@ -59,18 +115,29 @@ class EquipmentFilter(BootstrapFilterFormMixin, django_filters.FilterSet):
             "assigned_to",
         ]
 
+    def filter_age(self, queryset, name, value):
+        if value == "lt3":
+            return queryset.used_less_than(3)
+        if value in ("3", "5"):
+            return queryset.used_at_least(int(value))
+        return queryset
+
+    def sort_by(self, queryset, name, value):
+        # срок использования = порядок по commissioning_date (индекс), без даты — в конце
+        if value == "age_desc":
+            return queryset.order_by(F("commissioning_date").asc(nulls_last=True), "-id")
+        if value == "age_asc":
+            return queryset.order_by(F("commissioning_date").desc(nulls_last=True), "-id")
+        return queryset
+
     def search(self, queryset, name, value):
         value = (value or "").strip()
         if not value:
             return queryset
-        return queryset.filter(
-            models.Q(name__icontains=value)
-            | models.Q(inventory_number__icontains=value)
-            | models.Q(serial_number__icontains=value)
-            | models.Q(model__icontains=value)
-            | models.Q(specs__icontains=value)
-            | models.Q(cpu__icontains=value)
-            | models.Q(print_format__icontains=value)
-        )
+        qs = search_equipment(queryset, value)
+        if "search_rank" in qs.query.annotations:
+            # сначала самые релевантные, дальше — прежний порядок списка
+            qs = qs.order_by("-search_rank", *queryset.query.order_by)
+        return qs
 
 
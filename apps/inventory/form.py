@@ -1,9 +1,11 @@
 
 from django import forms
 from django.db.models import Q
+from django.urls import reverse_lazy
 from apps.directory.models import Employee, Organization
 from apps.inventory.models import Equipment, EquipmentStatus, EquipmentType
-from apps.directory.access import get_allowed_organizations
+from apps.directory.access import filter_queryset_by_user_orgs, get_allowed_organizations
+from config.widgets import RemoteSelect
 
 
 class EquipmentForm(forms.ModelForm):
@@ -43,7 +45,7 @@ class EquipmentForm(forms.ModelForm):
             emp_qs = Employee.objects.none()
 
         if user and not user.is_superuser:
-            emp_qs = emp_qs.filter(organization__in=allowed_orgs)
+            emp_qs = filter_queryset_by_user_orgs(emp_qs, user, "organization")
 
         self.fields["assigned_to"].queryset = emp_qs.select_related("department").order_by("full_name")
         self.fields["assigned_to"].required = False
@@ -104,6 +106,16 @@ class EquipmentForm(forms.ModelForm):
         widgets = {
             "commissioning_date": forms.DateInput(attrs={"type": "date"}),
             "specs": forms.Textarea(attrs={"rows": 4}),
+            # варианты подгружаются по AJAX, в HTML — только выбранное значение
+            "organization": RemoteSelect(
+                reverse_lazy("directory:ajax_organizations"), placeholder="Выберите организацию"
+            ),
+            "assigned_to": RemoteSelect(
+                reverse_lazy("inventory:ajax_employees_by_org"),
+                depends_on="id_organization",
+                depends_param="organization_id",
+                require_parent=True,
+            ),
         }
 
 
@@ -137,7 +149,7 @@ class EquipmentMoveForm(forms.Form):
             qs = qs.filter(organization=equipment.organization)
 
         if user and not user.is_superuser:
-            qs = qs.filter(organization__in=get_allowed_organizations(user))
+            qs = filter_queryset_by_user_orgs(qs, user, "organization")
 
         self.fields["to_employee"].queryset = qs.select_related("department").order_by("full_name")
 
@@ -175,3 +187,18 @@ class EquipmentCSVImportForm(forms.Form):
         required=False,
         initial=True,
     )
+    delimiter = forms.ChoiceField(
+        label="Разделитель",
+        # табуляция — не символом: браузер может обрезать пробельное value
+        choices=[(";", "Точка с запятой (;)"), (",", "Запятая (,)"), ("tab", "Табуляция (TSV)")],
+        initial=";",
+        required=False,
+    )
+    dry_run = forms.BooleanField(
+        label="Только проверить файл, ничего не записывая",
+        required=False,
+    )
+
+    def clean_delimiter(self):
+        value = self.cleaned_data["delimiter"] or ";"
+        return "\t" if value == "tab" else value
@@ -0,0 +1,137 @@
+"""
+Фоновый импорт CSV. View сохраняет файл в ImportJob и ставит задачу в очередь;
+задача импортирует порциями, после каждой порции в той же транзакции пишет прогресс.
+Упавший воркер (или потерянное сообщение) подхватывается по устаревшему heartbeat_at.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .importers import EquipmentImporter, ImportResult, open_csv
+from .models import ImportJob, ImportJobStatus
+
+
+class ImportJobTakenOver(Exception):
+    """Задание перехватил другой воркер — текущая порция откатывается."""
+
+
+def stale_after():
+    return timedelta(seconds=getattr(settings, "IMPORT_JOB_STALE", 5 * 60))
+
+
+def max_attempts():
+    return getattr(settings, "IMPORT_JOB_MAX_ATTEMPTS", 3)
+
+
+def max_errors():
+    return getattr(settings, "IMPORT_JOB_MAX_ERRORS", 500)
+
+
+def enqueue_import_job(request, upload, update_existing=False, delimiter=";"):
+    from .tasks import run_import_job
+
+    job = ImportJob.objects.create(
+        file=upload,
+        filename=upload.name[:255],
+        delimiter=delimiter,
+        update_existing=update_existing,
+        created_by=request.user,
+    )
+    transaction.on_commit(lambda: run_import_job.delay(str(job.pk)))
+    return job
+
+
+def stale_jobs_q(now=None):
+    """Задания, которые никто не выполняет: не взятые из очереди или с заглохшим воркером."""
+    border = (now or timezone.now()) - stale_after()
+    return (
+        Q(status=ImportJobStatus.PENDING, created_at__lt=border)
+        | Q(status=ImportJobStatus.RUNNING, heartbeat_at__lt=border)
+        | Q(status=ImportJobStatus.RUNNING, heartbeat_at__isnull=True)
+    )
+
+
+def claim_import_job(job_id):
+    """
+    Забирает задание атомарно: новое или брошенное упавшим воркером, если попытки
+    не исчерпаны. Возвращает ImportJob или None, если задание уже выполняется/завершено.
+    """
+    now = timezone.now()
+    claimable = (Q(status=ImportJobStatus.PENDING) | stale_jobs_q(now)) & Q(attempts__lt=max_attempts())
+    taken = ImportJob.objects.filter(claimable, pk=job_id).update(
+        status=ImportJobStatus.RUNNING, heartbeat_at=now, attempts=F("attempts") + 1,
+    )
+    if not taken:
+        return None
+    return ImportJob.objects.select_related("created_by").get(pk=job_id)
+
+
+def fail_exhausted_jobs(now=None):
+    """Брошенные задания, исчерпавшие IMPORT_JOB_MAX_ATTEMPTS, — в FAILED (иначе их перезапускали бы вечно)."""
+    now = now or timezone.now()
+    return ImportJob.objects.filter(stale_jobs_q(now), attempts__gte=max_attempts()).update(
+        status=ImportJobStatus.FAILED,
+        error="Импорт прерывался несколько раз подряд и остановлен.",
+        finished_at=now,
+    )
+
+
+def _count_rows(job):
+    with job.file.open("rb") as fh, open_csv(fh, job.delimiter) as reader:
+        return sum(1 for _ in reader)
+
+
+def execute_import_job(job):
+    """Импорт с места остановки (processed_row); уже записанные порции не повторяются."""
+    if job.total_rows is None:
+        job.total_rows = _count_rows(job)
+        ImportJob.objects.filter(pk=job.pk).update(total_rows=job.total_rows)
+
+    importer = EquipmentImporter(job.created_by, update_existing=job.update_existing)
+    result = ImportResult(
+        created=job.created_count,
+        updated=job.updated_count,
+        unchanged=job.unchanged_count,
+        row_errors=[tuple(e) for e in job.errors],
+    )
+    limit = max_errors()
+    # ошибки сверх лимита только считаются: список не растёт и не переписывается целиком
+    dropped = job.error_count - len(job.errors)
+    stored = len(job.errors)
+
+    def save_progress(result, last_row):
+        nonlocal dropped, stored
+        if len(result.row_errors) > limit:
+            dropped += len(result.row_errors) - limit
+            del result.row_errors[limit:]
+        fields = dict(
+            processed_row=last_row,
+            created_count=result.created,
+            updated_count=result.updated,
+            unchanged_count=result.unchanged,
+            error_count=dropped + len(result.row_errors),
+        )
+        if len(result.row_errors) != stored:
+            fields["errors"] = [list(e) for e in result.row_errors]
+
+        now = timezone.now()
+        saved = ImportJob.objects.filter(
+            pk=job.pk, status=ImportJobStatus.RUNNING, heartbeat_at=job.heartbeat_at,
+        ).update(heartbeat_at=now, **fields)
+        if not saved:
+            raise ImportJobTakenOver(str(job.pk))
+        job.heartbeat_at = now
+        stored = len(result.row_errors)
+
+    with job.file.open("rb") as fh, open_csv(fh, job.delimiter) as reader:
+        missing = importer.missing_columns(reader.fieldnames)
+        if missing:
+            raise ValueError("Отсутствуют обязательные колонки: " + ", ".join(missing))
+        importer.run(reader, resume_after=job.processed_row, result=result, on_chunk=save_progress)
+
+    ImportJob.objects.filter(pk=job.pk, heartbeat_at=job.heartbeat_at).update(
+        status=ImportJobStatus.DONE, finished_at=timezone.now(),
+    )
@@ -0,0 +1,226 @@
+"""
+Проверка CSV без записи (dry run). Строки разбираются тем же parse_row, что и при
+импорте, по справочникам в памяти импортёра, плюс валидаторы полей моделей
+(длина, диапазон чисел). Большие файлы проверяются в пуле процессов порциями.
+Ссылки, зависящие от предыдущих строк (сотрудник, созданный строкой выше;
+повтор инвентарного номера), и существующее оборудование разрешаются в основном
+процессе — по запросу на порцию.
+
+Модели импортируются внутри функций: модуль загружается в spawn-процессах
+пула до django.setup().
+"""
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+
+# импортёр в процессе пула (см. _init_worker)
+_worker_importer = None
+
+
+def _validate_workers():
+    workers = getattr(settings, "IMPORT_VALIDATE_WORKERS", 0) or os.cpu_count() or 1
+    # в демоническом процессе (prefork Celery) свой пул создавать нельзя
+    if multiprocessing.current_process().daemon:
+        return 1
+    return workers
+
+
+def _init_worker(payload):
+    global _worker_importer
+    import django
+
+    django.setup()
+    _worker_importer = pickle.loads(payload)
+
+
+def _check_in_worker(batch):
+    return _check_batch(_worker_importer, batch)
+
+
+@lru_cache(maxsize=None)
+def _model_fields():
+    from apps.directory.models import Department, Employee
+
+    from .importers import IMPORT_FIELDS
+    from .models import Equipment
+
+    return (
+        {name: Equipment._meta.get_field(name) for name in IMPORT_FIELDS},
+        Department._meta.get_field("name"),
+        Employee._meta.get_field("full_name"),
+    )
+
+
+def _run_field_validators(parsed):
+    from django.core.exceptions import ValidationError
+
+    equipment_fields, department_field, employee_field = _model_fields()
+    checks = [(equipment_fields[name], value) for name, value in parsed.values.items()]
+    checks.append((department_field, parsed.department_name))
+    checks.append((employee_field, parsed.employee_name))
+    for model_field, value in checks:
+        if value in (None, ""):
+            continue
+        try:
+            model_field.run_validators(value)
+        except ValidationError as e:
+            raise ValueError(f"{model_field.verbose_name}: {' '.join(e.messages)}") from None
+
+
+def _check_batch(importer, batch):
+    """
+    [(номер строки, ошибка, ссылка)]; ссылка — (org_id, инв. номер, сотрудник_norm,
+    сотрудник, есть ли подразделение, type_id, значения) для строк без ошибок,
+    None — для пустых.
+    """
+    from apps.directory.normalize import normalize_search
+
+    checked = []
+    for number, row in batch:
+        try:
+            parsed = importer.parse_row(number, row)
+            if parsed is not None:
+                _run_field_validators(parsed)
+        except Exception as e:
+            checked.append((number, str(e), None))
+            continue
+        if parsed is None:
+            checked.append((number, None, None))
+            continue
+        checked.append((number, None, (
+            parsed.organization.id,
+            parsed.values["inventory_number"],
+            normalize_search(parsed.employee_name),
+            parsed.employee_name,
+            bool(parsed.department_name),
+            parsed.equipment_type.id,
+            parsed.values,
+        )))
+    return checked
+
+
+def _batches(rows, start, size):
+    batch = []
+    for number, row in enumerate(rows, start=start):
+        batch.append((number, row))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _checked_batches(importer, batches):
+    """Проверенные порции в порядке файла; начало файла — без пула, остальное — в пуле."""
+    workers = _validate_workers()
+    threshold = getattr(settings, "IMPORT_VALIDATE_PARALLEL_ROWS", 20000)
+
+    batches = iter(batches)
+    checked = 0
+    for batch in batches:
+        yield _check_batch(importer, batch)
+        checked += len(batch)
+        if workers > 1 and checked >= threshold:
+            break
+    else:
+        return
+
+    # модели в импортёре распаковываются в процессе только после django.setup()
+    payload = pickle.dumps(importer)
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(payload,),
+    ) as pool:
+        # в работе — не больше двух порций на процесс, файл читается по мере проверки
+        pending = []
+        for batch in batches:
+            pending.append(pool.submit(_check_in_worker, batch))
+            if len(pending) >= workers * 2:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def _load_employee_keys(refs, known):
+    from apps.directory.models import Employee
+    from apps.directory.normalize import normalize_search
+
+    from .importers import find_by_name
+
+    wanted = {(ref[0], ref[2]): ref[3] for ref in refs if ref[2]}
+    wanted = {key: name for key, name in wanted.items() if key not in known}
+    if not wanted:
+        return
+    names = {emp_norm: name for (_, emp_norm), name in wanted.items()}
+    # при совпадении имён импорт берёт первого созданного — он идёт последним
+    for employee in find_by_name(Employee, "full_name", {org_id for org_id, _ in wanted}, names):
+        known[(employee.organization_id, normalize_search(employee.full_name))] = employee.pk
+
+
+def _load_inventory_keys(refs, known):
+    from .models import Equipment
+
+    wanted = {(ref[0], ref[1]) for ref in refs if ref[1]} - known.keys()
+    if not wanted:
+        return
+    qs = Equipment.objects.filter(
+        organization_id__in={org_id for org_id, _ in wanted},
+        inventory_number__in={number for _, number in wanted},
+    )
+    # как импорт: при повторе номера обновляется самая новая запись
+    rows = qs.order_by("created_at").values_list("organization_id", "inventory_number", "import_hash")
+    for org_id, number, digest in rows:
+        known[(org_id, number)] = digest
+
+
+def validate_rows(importer, rows, start=2):
+    """
+    Проверяет строки, ничего не записывая. ImportResult: created/updated/unchanged —
+    что сделал бы импорт, ошибки — те же, что дал бы импорт.
+    """
+    from .importers import EMPLOYEE_WITHOUT_DEPARTMENT, ImportResult, row_hash
+
+    result = ImportResult()
+    # (org_id, сотрудник_norm) -> pk; None — сотрудника создаст строка выше
+    employees = {}
+    # (org_id, инв. номер) -> import_hash, каким он будет после предыдущих строк
+    inventory = {}
+    for checked in _checked_batches(importer, _batches(rows, start, importer.chunk_size)):
+        refs = [ref for _, _, ref in checked if ref]
+        _load_employee_keys(refs, employees)
+        if importer.update_existing:
+            _load_inventory_keys(refs, inventory)
+
+        for number, error, ref in checked:
+            if error:
+                result.add_error(number, error)
+                continue
+            if ref is None:
+                continue
+            org_id, inventory_number, emp_norm, emp_name, has_department, type_id, values = ref
+            employee_id = None
+            if emp_norm:
+                if (org_id, emp_norm) not in employees:
+                    if not has_department:
+                        result.add_error(number, EMPLOYEE_WITHOUT_DEPARTMENT.format(emp_name))
+                        continue
+                    employees[(org_id, emp_norm)] = None
+                employee_id = employees[(org_id, emp_norm)]
+
+            # у нового сотрудника pk ещё нет — строка точно изменится
+            digest = None if emp_norm and employee_id is None else row_hash(org_id, type_id, employee_id, values)
+            key = (org_id, inventory_number)
+            if importer.update_existing and inventory_number and key in inventory:
+                if digest is not None and inventory[key] == digest:
+                    result.unchanged += 1
+                    continue
+                result.updated += 1
+            else:
+                result.created += 1
+            if inventory_number:
+                inventory[key] = digest
+    return result
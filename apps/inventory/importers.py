@@ -0,0 +1,704 @@
+"""
+Импорт оборудования из CSV. Справочники (организации, типы) загружаются один раз,
+подразделения, сотрудники и существующее оборудование — пачкой на порцию строк,
+запись — bulk_create/bulk_update по порциям. Ошибки копятся построчно, как раньше.
+"""
+import codecs
+import csv
+import hashlib
+import io
+import json
+import secrets
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.directory.access import get_org_scope
+from apps.directory.models import Department, Employee, Organization
+from apps.directory.normalize import normalize_search
+from config.counting import bump_count_version
+
+from .models import Equipment, EquipmentEvent, EquipmentEventType, EquipmentStatus, EquipmentType, PrintMode
+from .search import index_equipment
+
+HEADER_ALIASES = {
+    "organization_code": {
+        "organization_code",
+        "org_code",
+        "код_организации",
+        "Код организации",
+        "код",
+        "organization",
+        "организация",
+    },
+    "inventory_number": {
+        "inventory_number",
+        "инвентарный номер",
+        "инв_номер",
+        "инв. №",
+        "инв №",
+    },
+    "name": {
+        "name",
+        "наименование",
+        "название",
+    },
+    "assigned_to": {
+        "assigned_to",
+        "закреплено",
+        "сотрудник",
+        "ответственный",
+        "фио",
+    },
+    "department_name": {
+        "подразделение",
+        "отдел",
+        "department",
+        "department_name"
+    },
+    "equipment_type": {
+        "equipment_type",
+        "тип",
+        "тип оборудования",
+        "вид оборудования",
+    },
+    "serial_number": {
+        "serial_number",
+        "серийный номер",
+        "серийник",
+    },
+    "model": {
+        "model",
+        "модель",
+    },
+    "specs": {
+        "specs",
+        "характеристики",
+        "описание",
+    },
+    "cpu": {
+        "cpu",
+        "процессор",
+    },
+    "ram_gb": {
+        "ram_gb",
+        "озу",
+        "озу гб",
+        "ram",
+        "ram gb",
+    },
+    "storageHDD_gb": {
+        "storagehdd_gb",
+        "hdd",
+        "hdd гб",
+    },
+    "storageSDD_gb": {
+        "storagesdd_gb",
+        "sdd",
+        "ssd",
+        "ssd гб",
+        "sdd гб",
+    },
+    "print_format": {
+        "print_format",
+        "формат печати",
+    },
+    "print_mode": {
+        "print_mode",
+        "тип печати",
+        "печать",
+    },
+    "status": {
+        "status",
+        "статус",
+    },
+    "commissioning_date": {
+        "commissioning_date",
+        "дата поступления",
+        "дата ввода",
+    },
+}
+
+REQUIRED_COLUMNS = {
+    "organization_code": "Код организации",
+    "equipment_type": "Тип",
+    "name": "Наименование",
+}
+
+# поля Equipment, которые заполняет импорт
+IMPORT_FIELDS = [
+    "organization", "equipment_type", "name", "inventory_number", "serial_number", "model",
+    "specs", "commissioning_date", "status", "assigned_to", "cpu", "ram_gb",
+    "storageHDD_gb", "storageSDD_gb", "print_format", "print_mode",
+]
+
+
+def normalize_header(value):
+    return " ".join((value or "").strip().lower().replace("_", " ").split())
+
+
+# нормализованный заголовок -> каноническое имя поля
+_ALIAS_INDEX = {
+    normalize_header(alias): canonical
+    for canonical, aliases in HEADER_ALIASES.items()
+    for alias in aliases
+}
+
+
+SNIFF_CHUNK_SIZE = 64 * 1024
+
+EMPLOYEE_WITHOUT_DEPARTMENT = "Сотрудник не найден, а подразделение не указано: {}"
+
+
+def _check_decoding(fileobj, encoding, chunk_size):
+    """
+    Декодирует файл потоком, ничего не храня. Возвращает (ok, был ли до ошибки
+    уже раскодирован не-ASCII текст).
+    """
+    fileobj.seek(0)
+    decoder = codecs.getincrementaldecoder(encoding)()
+    seen_non_ascii = False
+    try:
+        # final=False: многобайтовый символ может быть разрезан границей куска
+        while chunk := fileobj.read(chunk_size):
+            seen_non_ascii = not decoder.decode(chunk, final=False).isascii() or seen_non_ascii
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False, seen_non_ascii
+    return True, seen_non_ascii
+
+
+def sniff_encoding(fileobj, chunk_size=SNIFF_CHUNK_SIZE):
+    """
+    Кодировка загруженного CSV: utf-8-sig или cp1251. Файл целиком проверяется
+    потоком до записи первой строки — иначе байт в другой кодировке в конце файла
+    оборвал бы импорт после уже закоммиченных порций. Смесь UTF-8 и cp1251 и
+    прочие кодировки — UnicodeDecodeError. Позиция возвращается в начало.
+    """
+    try:
+        ok, mixed = _check_decoding(fileobj, "utf-8-sig", chunk_size)
+        if ok:
+            return "utf-8-sig"
+        if not mixed and _check_decoding(fileobj, "cp1251", chunk_size)[0]:
+            return "cp1251"
+    finally:
+        fileobj.seek(0)
+    raise UnicodeDecodeError("utf-8", b"", 0, 0, "файл не в UTF-8 и не в Windows-1251")
+
+
+@contextmanager
+def open_csv(fileobj, delimiter=";"):
+    """
+    DictReader поверх загруженного файла без чтения его в память: байты
+    декодируются потоком через TextIOWrapper, строки отдаются по одной.
+    Файл после выхода не закрывается.
+    """
+    encoding = sniff_encoding(fileobj)
+    text = io.TextIOWrapper(fileobj, encoding=encoding, newline="")
+    try:
+        yield csv.DictReader(text, delimiter=delimiter)
+    finally:
+        # иначе TextIOWrapper закроет файл загрузки при сборке мусора
+        text.detach()
+
+
+def row_hash(organization_id, equipment_type_id, assigned_to_id, values):
+    """
+    Хэш импортируемых значений строки (после разбора и поиска сотрудника):
+    совпал с Equipment.import_hash — строка с прошлого импорта не менялась.
+    """
+    payload = [organization_id, equipment_type_id, assigned_to_id, sorted(values.items())]
+    raw = json.dumps(payload, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def update_rows(objs, fields):
+    """
+    UPDATE ... WHERE id = %s через executemany. bulk_update строит CASE WHEN по каждому
+    полю и на десятках тысяч строк тратит больше времени в Django, чем в БД.
+    """
+    if not objs:
+        return
+    model = type(objs[0])
+    connection = connections[router.db_for_write(model)]
+    qn = connection.ops.quote_name
+    columns = [model._meta.get_field(name) for name in fields]
+    sql = "UPDATE {} SET {} WHERE {} = %s".format(
+        qn(model._meta.db_table),
+        ", ".join(f"{qn(f.column)} = %s" for f in columns),
+        qn(model._meta.pk.column),
+    )
+    params = [
+        [f.get_db_prep_save(getattr(obj, f.attname), connection) for f in columns] + [obj.pk]
+        for obj in objs
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    # найдено по инвентарному номеру, но в файле ничего не поменялось (import_hash)
+    unchanged: int = 0
+    row_errors: list = field(default_factory=list)
+
+    def add_error(self, number, message):
+        self.row_errors.append((number, str(message)))
+
+    def merge(self, other):
+        self.created += other.created
+        self.updated += other.updated
+        self.unchanged += other.unchanged
+        self.row_errors.extend(other.row_errors)
+
+    @property
+    def errors(self):
+        """Ошибки по порядку строк: "Строка N: ..."."""
+        return [f"Строка {number}: {message}" for number, message in sorted(self.row_errors, key=lambda e: e[0])]
+
+
+@dataclass
+class _ParsedRow:
+    number: int
+    organization: Organization
+    equipment_type: EquipmentType
+    department_name: str
+    employee_name: str
+    values: dict
+
+
+# сколько имён в одном OR-запросе (глубина выражения в SQLite ограничена)
+NAME_FALLBACK_BATCH = 200
+
+
+def find_by_name(model, field, org_ids, names):
+    """
+    Строки справочника организаций org_ids по нормализованным именам
+    names = {норм. имя: имя из файла}, от новых к старым (при повторе имени
+    побеждает первая созданная — она присваивается последней).
+    Основной запрос — по индексу field_norm. Имена, которых там нет, ищутся ещё
+    и через iexact по самому полю: field_norm мог остаться пустым или устаревшим
+    у строк, изменённых в обход save().
+    """
+    if not names:
+        return []
+    norm_field = f"{field}_norm"
+    base = model.objects.filter(organization_id__in=org_ids)
+    found = list(base.filter(**{f"{norm_field}__in": names}).order_by("-pk"))
+
+    missing = set(names) - {getattr(obj, norm_field) for obj in found}
+    originals = [names[norm] for norm in missing]
+    for start in range(0, len(originals), NAME_FALLBACK_BATCH):
+        q = Q()
+        for name in originals[start:start + NAME_FALLBACK_BATCH]:
+            q |= Q(**{f"{field}__iexact": name})
+        for obj in base.filter(q).order_by("-pk"):
+            if normalize_search(getattr(obj, field)) in missing:
+                found.append(obj)
+    found.sort(key=lambda obj: -obj.pk)
+    return found
+
+
+class EquipmentImporter:
+    """
+    importer = EquipmentImporter(user, update_existing=True)
+    result = importer.run(csv.DictReader(...))
+    """
+
+    def __init__(self, user, update_existing=False, chunk_size=None):
+        self.user = user
+        self.update_existing = update_existing
+        self.chunk_size = chunk_size or getattr(settings, "IMPORT_CHUNK_SIZE", 1000)
+
+        self.scope = get_org_scope(user)
+        self.status_map = self._build_choice_map(EquipmentStatus.choices)
+        self.print_mode_map = self._build_choice_map(PrintMode.choices)
+        self.organizations = {o.code.casefold(): o for o in Organization.objects.all()}
+        self.types = {}
+        for equipment_type in EquipmentType.objects.order_by("-pk"):
+            # при одинаковых названиях берём первый созданный, как .first() раньше
+            self.types[normalize_search(equipment_type.name)] = equipment_type
+
+        # заголовок CSV -> каноническое имя колонки
+        self._header_keys = {}
+        # (organization_id, *_norm) -> объект; пополняются по мере импорта
+        self.departments = {}
+        self.employees = {}
+
+    # --- разбор строк ---
+
+    def missing_columns(self, fieldnames):
+        """Человекочитаемые имена отсутствующих обязательных колонок."""
+        present = {_ALIAS_INDEX.get(normalize_header(h)) for h in fieldnames or () if h}
+        return [REQUIRED_COLUMNS[c] for c in sorted(REQUIRED_COLUMNS) if c not in present]
+
+    def _map_row_keys(self, row):
+        mapped = {}
+        for raw_key, value in row.items():
+            if not raw_key:
+                continue
+            # заголовки одни на весь файл — нормализуем каждый один раз
+            try:
+                canonical = self._header_keys[raw_key]
+            except KeyError:
+                canonical = self._header_keys[raw_key] = _ALIAS_INDEX.get(normalize_header(raw_key))
+            if canonical:
+                mapped[canonical] = (value or "").strip()
+        return mapped
+
+    def _parse_int(self, value):
+        value = (value or "").strip()
+        if not value:
+            return None
+        return int(value)
+
+    def _parse_date(self, value):
+        value = (value or "").strip()
+        if not value:
+            return None
+
+        for fmt in ("%Y-%m-%d", "%d.%m.%Y", "%d/%m/%Y"):
+            try:
+                return datetime.strptime(value, fmt).date()
+            except ValueError:
+                continue
+
+        raise ValueError(f"Неверная дата: {value}")
+
+    def _build_choice_map(self, choices):
+        result = {}
+        for code, label in choices:
+            result[normalize_header(code)] = code
+            result[normalize_header(label)] = code
+        return result
+
+    def _choice(self, value, choice_map, default, message):
+        if not value:
+            return default
+        code = choice_map.get(normalize_header(value))
+        if not code:
+            raise ValueError(f"{message}: {value}")
+        return code
+
+    def parse_row(self, number, row):
+        """Проверяет строку по справочникам в памяти; None — пустая строка."""
+        row = self._map_row_keys(row)
+        if not any(row.values()):
+            return None
+
+        org_code = row.get("organization_code", "")
+        type_name = row.get("equipment_type", "")
+        name = row.get("name", "")
+
+        if not org_code or not type_name or not name:
+            raise ValueError("Обязательные поля: Код организации, Тип, Наименование")
+
+        organization = self.organizations.get(org_code.casefold())
+        if not organization:
+            raise ValueError(f"Организация не найдена по коду: {org_code}")
+
+        if not self.scope.allows(organization.id):
+            raise ValueError(f"Нет доступа к организации: {org_code}")
+
+        equipment_type = self.types.get(normalize_search(type_name))
+        if not equipment_type:
+            raise ValueError(f"Тип оборудования не найден: {type_name}")
+
+        values = {
+            "name": name,
+            "inventory_number": row.get("inventory_number", ""),
+            "serial_number": row.get("serial_number", ""),
+            "model": row.get("model", ""),
+            "specs": row.get("specs", ""),
+            "commissioning_date": self._parse_date(row.get("commissioning_date", "")),
+            "status": self._choice(
+                row.get("status", ""), self.status_map, EquipmentStatus.IN_USE, "Неизвестный статус"),
+            "cpu": row.get("cpu", ""),
+            "ram_gb": self._parse_int(row.get("ram_gb", "")),
+            "storageHDD_gb": self._parse_int(row.get("storageHDD_gb", "")),
+            "storageSDD_gb": self._parse_int(row.get("storageSDD_gb", "")),
+            "print_format": row.get("print_format", ""),
+            "print_mode": self._choice(
+                row.get("print_mode", ""), self.print_mode_map, "", "Неизвестный тип печати"),
+        }
+        return _ParsedRow(
+            number=number,
+            organization=organization,
+            equipment_type=equipment_type,
+            department_name=row.get("department_name", ""),
+            employee_name=row.get("assigned_to", ""),
+            values=values,
+        )
+
+    # --- запись ---
+
+    def run(self, rows, start=2, resume_after=0, result=None, on_chunk=None):
+        """
+        rows — словари csv.DictReader; start — номер первой строки данных в файле.
+        resume_after — строки до этого номера включительно уже записаны и пропускаются.
+        on_chunk(result, last_row) вызывается в транзакции порции: прогресс
+        сохраняется атомарно вместе с данными (см. ImportJob).
+        """
+        result = result or ImportResult()
+        chunk = []
+        last_row = resume_after
+        for number, row in enumerate(rows, start=start):
+            if number <= resume_after:
+                continue
+            last_row = number
+            try:
+                parsed = self.parse_row(number, row)
+            except Exception as e:
+                result.add_error(number, e)
+                continue
+            if parsed is None:
+                continue
+            chunk.append(parsed)
+            if len(chunk) >= self.chunk_size:
+                self._commit(chunk, result, last_row, on_chunk)
+                chunk = []
+        if chunk or on_chunk:
+            self._commit(chunk, result, last_row, on_chunk)
+        return result
+
+    def _commit(self, chunk, result, last_row, on_chunk):
+        with transaction.atomic():
+            if chunk:
+                self.write_chunk(chunk, result)
+            if on_chunk:
+                on_chunk(result, last_row)
+
+    def write_chunk(self, chunk, result):
+        """
+        Пишет порцию одной транзакцией. Если порция падает на уровне БД,
+        она повторяется построчно — чтобы ошибка досталась своей строке.
+        """
+        try:
+            with transaction.atomic():
+                written = self._write(chunk)
+        except Exception as e:
+            # объекты из откатившейся транзакции в кэшах больше не годятся
+            self.departments.clear()
+            self.employees.clear()
+            if len(chunk) == 1:
+                result.add_error(chunk[0].number, e)
+                return
+            for parsed in chunk:
+                self.write_chunk([parsed], result)
+            return
+
+        result.merge(written)
+
+    def _write(self, chunk):
+        """Итог порции (ImportResult); вызывается в транзакции."""
+        result = ImportResult()
+        self._load_directory(chunk)
+
+        new_departments, new_employees, changed_employees = {}, {}, {}
+        resolved = []
+        for parsed in chunk:
+            try:
+                employee = self._resolve_employee(parsed, new_departments, new_employees, changed_employees)
+            except ValueError as e:
+                result.add_error(parsed.number, e)
+                continue
+            resolved.append((parsed, employee))
+
+        if new_departments:
+            departments = list(new_departments.values())
+            for department in departments:
+                department.fill_normalized_fields()
+            Department.objects.bulk_create(departments)
+            self.departments.update(new_departments)
+        reactivated = [d for d in self.departments.values() if getattr(d, "_import_reactivated", False)]
+        if reactivated:
+            Department.objects.bulk_update(reactivated, ["active"])
+
+        if new_employees:
+            employees = list(new_employees.values())
+            for employee in employees:
+                employee.fill_normalized_fields()
+            Employee.objects.bulk_create(employees)
+            self.employees.update(new_employees)
+        if changed_employees:
+            Employee.objects.bulk_update(list(changed_employees.values()), ["active", "department"])
+
+        for department in reactivated:
+            department._import_reactivated = False
+        if new_departments or reactivated:
+            bump_count_version(Department)
+        if new_employees or changed_employees:
+            bump_count_version(Employee)
+
+        created, updated = self._write_equipment(resolved, result)
+        if created or updated:
+            ids = [obj.pk for obj in created + updated]
+            transaction.on_commit(lambda: index_equipment(ids))
+            transaction.on_commit(lambda: bump_count_version(Equipment))
+        if created:
+            from .tasks import warm_qr_codes
+
+            # bulk_create идёт в обход post_save; PNG дороже самой записи — в Celery.
+            # robust: недоступный брокер/кэш не должен прерывать импорт
+            tokens = [obj.qr_token for obj in created]
+            transaction.on_commit(lambda: warm_qr_codes.delay(tokens), robust=True)
+        return result
+
+    def _load_directory(self, chunk):
+        """Подразделения и сотрудники порции — по запросу на справочник (плюс запасной, см. find_by_name)."""
+        org_ids = {p.organization.id for p in chunk}
+
+        dept_names = {
+            normalize_search(p.department_name): p.department_name for p in chunk
+            if p.department_name and (p.organization.id, normalize_search(p.department_name)) not in self.departments
+        }
+        for department in find_by_name(Department, "name", org_ids, dept_names):
+            self.departments[(department.organization_id, normalize_search(department.name))] = department
+
+        employee_names = {
+            normalize_search(p.employee_name): p.employee_name for p in chunk
+            if p.employee_name and (p.organization.id, normalize_search(p.employee_name)) not in self.employees
+        }
+        for employee in find_by_name(Employee, "full_name", org_ids, employee_names):
+            self.employees[(employee.organization_id, normalize_search(employee.full_name))] = employee
+
+    def _resolve_employee(self, parsed, new_departments, new_employees, changed_employees):
+        org = parsed.organization
+        department = None
+        if parsed.department_name:
+            key = (org.id, normalize_search(parsed.department_name))
+            department = self.departments.get(key) or new_departments.get(key)
+            if department is None:
+                department = Department(organization=org, name=parsed.department_name, active=True)
+                new_departments[key] = department
+            elif not department.active:
+                department.active = True
+                department._import_reactivated = True
+
+        if not parsed.employee_name:
+            return None
+
+        key = (org.id, normalize_search(parsed.employee_name))
+        employee = self.employees.get(key) or new_employees.get(key)
+        if employee is None:
+            if department is None:
+                raise ValueError(EMPLOYEE_WITHOUT_DEPARTMENT.format(parsed.employee_name))
+            employee = Employee(organization=org, full_name=parsed.employee_name, department=department, active=True)
+            new_employees[key] = employee
+            return employee
+
+        changed = False
+        if not employee.active:
+            employee.active = True
+            changed = True
+        if department is not None and (department.pk is None or employee.department_id != department.pk):
+            employee.department = department
+            changed = True
+        if changed and employee.pk is not None:
+            changed_employees[key] = employee
+        return employee
+
+    def _existing_equipment(self, resolved):
+        if not self.update_existing:
+            return {}
+        numbers = {p.values["inventory_number"] for p, _ in resolved if p.values["inventory_number"]}
+        if not numbers:
+            return {}
+        org_ids = {p.organization.id for p, _ in resolved}
+        existing = {}
+        qs = Equipment.objects.filter(organization_id__in=org_ids, inventory_number__in=numbers)
+        for equipment in qs.order_by("-created_at"):
+            # как .first() с сортировкой модели: самое новое
+            existing.setdefault((equipment.organization_id, equipment.inventory_number), equipment)
+        return existing
+
+    def _write_equipment(self, resolved, result):
+        """
+        Оборудование порции. Существующие строки с тем же import_hash не пишутся вовсе;
+        у обновлённых смена сотрудника/статуса попадает в журнал событий. Возвращает (созданные, обновлённые).
+        """
+        existing = self._existing_equipment(resolved)
+        now = timezone.now()
+        to_create, to_update = {}, {}
+        pending = {}
+        # (assigned_to_id, status) обновляемых строк до импорта — для событий
+        before = {}
+
+        for parsed, employee in resolved:
+            key = (parsed.organization.id, parsed.values["inventory_number"])
+            digest = row_hash(
+                parsed.organization.id, parsed.equipment_type.id, employee.pk if employee else None, parsed.values,
+            )
+            equipment = None
+            if self.update_existing and parsed.values["inventory_number"]:
+                equipment = pending.get(key) or existing.get(key)
+
+            # счётчики по строкам, как при построчном импорте: повтор номера в файле — обновление
+            if equipment is None:
+                equipment = Equipment(
+                    organization=parsed.organization,
+                    created_by=self.user,
+                    qr_token=secrets.token_hex(16),
+                )
+                to_create[id(equipment)] = equipment
+                result.created += 1
+            elif equipment.import_hash == digest:
+                result.unchanged += 1
+                pending[key] = equipment
+                continue
+            else:
+                if id(equipment) not in to_create and id(equipment) not in to_update:
+                    to_update[id(equipment)] = equipment
+                    before[id(equipment)] = (equipment.assigned_to_id, equipment.status)
+                result.updated += 1
+            pending[key] = equipment
+
+            equipment.organization = parsed.organization
+            equipment.equipment_type = parsed.equipment_type
+            equipment.assigned_to = employee
+            for name, value in parsed.values.items():
+                setattr(equipment, name, value)
+            equipment.updated_by = self.user
+            equipment.updated_at = now
+            equipment.import_hash = digest
+            equipment.fill_normalized_fields()
+
+        created = list(to_create.values())
+        updated = list(to_update.values())
+        if created:
+            Equipment.objects.bulk_create(created)
+        if updated:
+            update_rows(updated, IMPORT_FIELDS + ["name_norm", "updated_by", "updated_at", "import_hash"])
+            events = self._change_events(updated, before, now)
+            if events:
+                EquipmentEvent.objects.bulk_create(events)
+        return created, updated
+
+    def _change_events(self, updated, before, now):
+        """События перемещения/смены статуса для строк, где импорт их поменял."""
+        events = []
+        for equipment in updated:
+            old_employee_id, old_status = before[id(equipment)]
+            moved = old_employee_id != equipment.assigned_to_id
+            status_changed = old_status != equipment.status
+            if not moved and not status_changed:
+                continue
+            events.append(EquipmentEvent(
+                equipment=equipment,
+                event_type=EquipmentEventType.MOVE if moved else EquipmentEventType.STATUS,
+                created_at=now,
+                created_by=self.user,
+                from_employee_id=old_employee_id if moved else None,
+                to_employee_id=equipment.assigned_to_id if moved else None,
+                old_status=old_status if status_changed else "",
+                new_status=equipment.status if status_changed else "",
+                comment="Импорт CSV",
+            ))
+        return events
@@ -0,0 +1,142 @@
+"""
+Этикетки 58x40 прямо для термопринтера: те же данные, что в
+equipment_qr_label_58x40.html, но сразу командами ZPL или ESC/POS.
+Поток можно скачать файлом или отправить на сетевой принтер (raw TCP, порт 9100).
+"""
+import socket
+
+from django.conf import settings
+
+from .qr import qr_url
+
+# 203 dpi: 8 точек на мм
+ZPL_DOTS_PER_MM = 8
+# масштабируемый шрифт с кириллицей; встроенный ^A0 её не содержит
+ZPL_DEFAULT_FONT = "E:TT0003M_.TTF"
+LABEL_WIDTH_MM = 58
+LABEL_HEIGHT_MM = 40
+
+
+def label_fields(obj):
+    """Текст этикетки: то же, что выводит HTML-шаблон 58x40."""
+    assignee = obj.assigned_to.full_name if obj.assigned_to_id else ""
+    return {
+        "organization": str(obj.organization),
+        "kind": str(obj.equipment_type or obj.name or ""),
+        "name": obj.name or "",
+        "inventory_number": obj.inventory_number or "—",
+        "assignee": assignee,
+        "qr": qr_url(obj.qr_token),
+        "pk": obj.pk,
+    }
+
+
+def _zpl_text(value):
+    # ^FH: ^, ~ и сам "_" в данных передаются hex-кодами
+    out = []
+    for ch in str(value):
+        if ch in "^~_":
+            out.append("_%02X" % ord(ch))
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def _zpl_font(height):
+    font = getattr(settings, "LABEL_ZPL_FONT", "") or ZPL_DEFAULT_FONT
+    return f"^A@N,{height},{height},{font}"
+
+
+def _zpl_label(fields):
+    width = LABEL_WIDTH_MM * ZPL_DOTS_PER_MM
+    text_x = 23 * ZPL_DOTS_PER_MM
+    text_w = width - text_x - 2 * ZPL_DOTS_PER_MM
+
+    def block(y, height, text, lines=1):
+        return f"^FO{text_x},{y}{_zpl_font(height)}^FB{text_w},{lines},0,L^FH_^FD{_zpl_text(text)}^FS"
+
+    return "\n".join([
+        "^XA",
+        "^CI28",
+        f"^PW{width}",
+        f"^LL{LABEL_HEIGHT_MM * ZPL_DOTS_PER_MM}",
+        # QR слева (~22 мм), под ним ID
+        f"^FO8,16^BQN,2,5^FH_^FDMA,{_zpl_text(fields['qr'])}^FS",
+        f"^FO16,200{_zpl_font(20)}^FDID {fields['pk']}^FS",
+        block(24, 22, fields["organization"], lines=2),
+        block(80, 20, fields["kind"]),
+        block(106, 20, fields["name"], lines=2),
+        block(160, 20, fields["assignee"]),
+        block(196, 26, f"Инв. № {fields['inventory_number']}"),
+        "^XZ",
+    ])
+
+
+def render_zpl(objects):
+    """Байты ZPL (UTF-8, ^CI28): по этикетке на объект."""
+    return ("\n".join(_zpl_label(label_fields(obj)) for obj in objects) + "\n").encode("utf-8")
+
+
+# ESC/POS: кириллица — кодовая страница CP866 (ESC t 17 у Epson-совместимых)
+ESC_INIT = b"\x1b@"
+ESC_CODEPAGE_CP866 = b"\x1bt\x11"
+ESC_FEED_CUT = b"\x1bd\x03\x1dVB\x00"
+
+
+def _escpos_qr(data, size=6):
+    payload = data.encode("ascii")
+    store_len = len(payload) + 3
+    return b"".join([
+        b"\x1d(k\x04\x001A2\x00",                   # модель 2
+        b"\x1d(k\x03\x001C" + bytes([size]),        # размер модуля
+        b"\x1d(k\x03\x001E1",                       # коррекция M
+        b"\x1d(k" + bytes([store_len % 256, store_len // 256]) + b"1P0" + payload,
+        b"\x1d(k\x03\x001Q0",                       # печать
+    ])
+
+
+def _escpos_line(text):
+    return str(text).encode("cp866", errors="replace") + b"\n"
+
+
+def render_escpos(objects):
+    """Байты ESC/POS: QR, под ним текст этикетки, отрезка."""
+    out = [ESC_INIT, ESC_CODEPAGE_CP866]
+    for obj in objects:
+        fields = label_fields(obj)
+        out.append(_escpos_qr(fields["qr"]))
+        for key in ("organization", "kind", "name", "assignee"):
+            if fields[key]:
+                out.append(_escpos_line(fields[key]))
+        out.append(_escpos_line(f"Инв. № {fields['inventory_number']}   ID {fields['pk']}"))
+        out.append(ESC_FEED_CUT)
+    return b"".join(out)
+
+
+# формат -> (рендерер, расширение файла)
+LABEL_FORMATS = {
+    "zpl": (render_zpl, "zpl"),
+    "escpos": (render_escpos, "bin"),
+}
+
+
+def render_labels(objects, fmt):
+    renderer, _ = LABEL_FORMATS[fmt]
+    return renderer(objects)
+
+
+def label_printer_configured():
+    return bool(getattr(settings, "LABEL_PRINTER_HOST", ""))
+
+
+def send_to_printer(data, host=None, port=None, timeout=None):
+    """
+    Отправляет готовый поток на принтер по raw TCP (JetDirect, обычно порт 9100).
+    Ошибки соединения (OSError) пробрасываются вызывающему.
+    """
+    host = host or settings.LABEL_PRINTER_HOST
+    port = port or getattr(settings, "LABEL_PRINTER_PORT", 9100)
+    timeout = timeout or getattr(settings, "LABEL_PRINTER_TIMEOUT", 10)
+    with socket.create_connection((host, port), timeout=timeout) as conn:
+        conn.sendall(data)
+    return len(data)
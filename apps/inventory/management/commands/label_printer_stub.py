@@ -0,0 +1,44 @@
+import os
+import socket
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Заглушка сетевого принтера этикеток: слушает raw TCP (как порт 9100 принтера) "
+        "и сохраняет каждое задание в файл"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=9100)
+        parser.add_argument("--output-dir", default="label-jobs", help="куда складывать задания")
+        parser.add_argument("--count", type=int, default=0, help="выйти после N заданий (0 — работать всегда)")
+
+    def handle(self, *args, **options):
+        os.makedirs(options["output_dir"], exist_ok=True)
+        received = 0
+
+        with socket.create_server((options["host"], options["port"])) as server:
+            self.stdout.write(f"Жду задания на {options['host']}:{options['port']}…")
+            while not options["count"] or received < options["count"]:
+                conn, addr = server.accept()
+                with conn:
+                    chunks = []
+                    while True:
+                        data = conn.recv(65536)
+                        if not data:
+                            break
+                        chunks.append(data)
+                payload = b"".join(chunks)
+                received += 1
+
+                ext = "zpl" if payload.startswith(b"^XA") else "bin"
+                path = os.path.join(options["output_dir"], f"job-{received:04d}.{ext}")
+                with open(path, "wb") as fh:
+                    fh.write(payload)
+                labels = payload.count(b"^XA") if ext == "zpl" else payload.count(b"\x1dVB")
+                self.stdout.write(f"{addr[0]}: {len(payload)} байт, этикеток: {labels} -> {path}")
+
+        self.stdout.write(self.style.SUCCESS(f"Принято заданий: {received}."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from apps.directory.models import Department, Employee, Organization
+from apps.directory.normalize import refresh_normalized_fields
+from apps.inventory.models import Equipment
+from apps.inventory.search import ensure_search_index, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Пересчитать колонки *_norm и заново заполнить полнотекстовый индекс оборудования"
+
+    def handle(self, *args, **options):
+        for model in (Organization, Department, Employee, Equipment):
+            refresh_normalized_fields(model.objects.all())
+
+        ensure_search_index()
+        rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS("Поисковый индекс перестроен."))
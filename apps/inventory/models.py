@@ -1,8 +1,13 @@
+import uuid
+
 from dateutil.relativedelta import relativedelta
 from django.db import models
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.functions import ExtractMonth, ExtractYear
 from django.utils import timezone
 
 from apps.directory.models import Employee, Organization
+from apps.directory.normalize import NormalizedFieldsMixin
 from config import settings
 
 
@@ -38,7 +43,46 @@ class PrintMode(models.TextChoices):
     COLOR = "color", "Цветная"
 
 
-class Equipment(models.Model):
+class EquipmentQuerySet(models.QuerySet):
+    def with_usage_months(self, today=None):
+        """
+        Аннотация usage_months — полных месяцев с commissioning_date (как relativedelta),
+        считается в БД. None, если дата не указана или в будущем.
+        """
+        today = today or timezone.now().date()
+        months = (
+            (Value(today.year) - ExtractYear("commissioning_date")) * 12
+            + (Value(today.month) - ExtractMonth("commissioning_date"))
+            - Case(
+                When(commissioning_date__day__gt=today.day, then=Value(1)),
+                default=Value(0),
+            )
+        )
+        return self.annotate(
+            usage_months=Case(
+                When(commissioning_date__isnull=True, then=Value(None)),
+                When(commissioning_date__gt=today, then=Value(None)),
+                default=months,
+                output_field=IntegerField(),
+            )
+        )
+
+    def used_at_least(self, years, today=None):
+        """
+        Используется не меньше years лет — диапазон по индексу commissioning_date.
+        """
+        today = today or timezone.now().date()
+        return self.filter(commissioning_date__lte=today - relativedelta(years=years))
+
+    def used_less_than(self, years, today=None):
+        today = today or timezone.now().date()
+        return self.filter(
+            commissioning_date__gt=today - relativedelta(years=years),
+            commissioning_date__lte=today,
+        )
+
+
+class Equipment(NormalizedFieldsMixin, models.Model):
     organization = models.ForeignKey("directory.Organization", on_delete=models.PROTECT, related_name="equipment",
                                      verbose_name="Организация")
     equipment_type = models.ForeignKey(EquipmentType, on_delete=models.PROTECT, related_name="equipment",
@@ -46,6 +90,7 @@ class Equipment(models.Model):
 
     name = models.CharField(max_length=200,
                             verbose_name="Наименование")  # коротко: : PC400-001 "ПК Lenovo", "Принтер HP"
+    name_norm = models.CharField(max_length=200, blank=True, editable=False, db_index=True)
     inventory_number = models.CharField(max_length=100, blank=True, verbose_name="Инв. №")  # если есть
     # pc_number = models.CharField(max_length=50, blank=True, verbose_name="Номер ПК")  # если есть: PC400-001
 
@@ -65,6 +110,8 @@ class Equipment(models.Model):
 
     # Уникальный токен для QR (удобно печатать/сканировать и открывать карточку)
     qr_token = models.CharField(max_length=32, unique=True, editable=False)
+    # хэш значений из последнего импорта CSV (см. importers.row_hash); сбрасывается при save()
+    import_hash = models.CharField(max_length=40, blank=True, editable=False)
 
     # Компьютеры
     cpu = models.CharField("Процессор", max_length=255, blank=True)
@@ -96,6 +143,10 @@ class Equipment(models.Model):
         verbose_name="Обновлён",
     )
 
+    objects = EquipmentQuerySet.as_manager()
+
+    normalized_fields = {"name_norm": "name"}
+
     class Meta:
         verbose_name = "Оборудование"
         verbose_name_plural = "Оборудование"
@@ -105,6 +156,9 @@ class Equipment(models.Model):
             models.Index(fields=["status"]),
             models.Index(fields=["qr_token"]),
             models.Index(fields=["organization", "equipment_type"]),
+            # keyset-пагинация списка: ORDER BY created_at DESC, id DESC
+            models.Index(fields=["created_at", "id"]),
+            models.Index(fields=["commissioning_date"]),
         ]
         ordering = ["-created_at"]
 
@@ -117,6 +171,11 @@ class Equipment(models.Model):
             # простой уникальный токен
             import secrets
             self.qr_token = secrets.token_hex(16)
+        # правка не через импорт: строка могла разойтись с файлом, повторный импорт её перезапишет
+        self.import_hash = ""
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = set(update_fields) | {"import_hash"}
         super().save(*args, **kwargs)
 
     @property
@@ -129,16 +188,35 @@ class Equipment(models.Model):
             return None
         return relativedelta(today, self.commissioning_date)
 
+    def get_usage_months(self):
+        """Полных месяцев использования: из аннотации with_usage_months или через relativedelta."""
+        if "usage_months" in self.__dict__:
+            return self.usage_months
+        rd = self.usage_duration
+        if rd is None:
+            return None
+        return rd.years * 12 + rd.months
+
+    @property
+    def usage_level(self):
+        """Уровень для подсветки: danger — от 5 лет, warning — от 3 лет."""
+        months = self.get_usage_months()
+        if months is not None and months >= 60:
+            return "danger"
+        if months is not None and months >= 36:
+            return "warning"
+        return "success"
+
     @property
     def usage_duration_display(self):
         """Срок использования в формате '2 г. 3 мес.' """
-        rd = self.usage_duration
-        if rd is None:
+        total = self.get_usage_months()
+        if total is None:
             return "—"
 
         parts = []
-        if rd.years:
-            y = rd.years
+        y, m = divmod(total, 12)
+        if y:
             if y % 10 == 1 and y % 100 != 11:
                 parts.append(f"{y} год")
             elif 2 <= y % 10 <= 4 and not (12 <= y % 100 <= 14):
@@ -146,8 +224,7 @@ class Equipment(models.Model):
             else:
                 parts.append(f"{y} лет")
 
-        if rd.months:
-            m = rd.months
+        if m:
             if m % 10 == 1 and m % 100 != 11:
                 parts.append(f"{m} месяц")
             elif 2 <= m % 10 <= 4 and not (12 <= m % 100 <= 14):
@@ -156,7 +233,9 @@ class Equipment(models.Model):
                 parts.append(f"{m} месяцев")
 
         if not parts:
-            if rd.days:
+            # меньше месяца — считаем дни (редкий случай)
+            rd = self.usage_duration
+            if rd and rd.days:
                 d = rd.days
                 if d % 10 == 1 and d % 100 != 11:
                     parts.append(f"{d} день")
@@ -272,3 +351,119 @@ class InventoryDocumentLine(models.Model):
         # if not self.pc_number_snapshot:
         #     self.pc_number_snapshot = self.equipment.pc_number or ""
         super().save(*args, **kwargs)
+
+
+class PdfJobStatus(models.TextChoices):
+    PENDING = "pending", "В очереди"
+    RUNNING = "running", "Формируется"
+    DONE = "done", "Готово"
+    FAILED = "failed", "Ошибка"
+
+
+class PdfJob(models.Model):
+    """
+    Фоновое формирование PDF-отчёта (Celery). kind — ключ PDF_JOB_VIEWS,
+    params — GET-параметры исходного запроса. Готовый файл лежит в MEDIA до expires_at.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50)
+    params = models.TextField(blank=True)
+    base_url = models.CharField(max_length=300, blank=True)
+
+    status = models.CharField(max_length=20, choices=PdfJobStatus.choices, default=PdfJobStatus.PENDING)
+    file = models.FileField(upload_to="pdf_jobs/%Y/%m/%d/", blank=True)
+    filename = models.CharField(max_length=200, blank=True)
+    error = models.TextField(blank=True)
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="pdf_jobs",
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    # когда воркер взял задание; по нему находятся задания упавших воркеров
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    # сколько раз задание забирал воркер; после PDF_JOB_MAX_ATTEMPTS оно не перезапускается
+    attempts = models.PositiveIntegerField(default=0)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        verbose_name = "PDF-задание"
+        verbose_name_plural = "PDF-задания"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "heartbeat_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} — {self.get_status_display()} — {self.created_at:%Y-%m-%d %H:%M}"
+
+    @property
+    def is_finished(self):
+        return self.status in (PdfJobStatus.DONE, PdfJobStatus.FAILED)
+
+
+class ImportJobStatus(models.TextChoices):
+    PENDING = "pending", "В очереди"
+    RUNNING = "running", "Импортируется"
+    DONE = "done", "Готово"
+    FAILED = "failed", "Ошибка"
+
+
+class ImportJob(models.Model):
+    """
+    Фоновый импорт CSV (Celery). Файл лежит в MEDIA; после каждой записанной порции
+    в той же транзакции сохраняются processed_row, счётчики и ошибки — после падения
+    воркера импорт продолжается со следующей строки, уже записанное не повторяется.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file = models.FileField(upload_to="imports/%Y/%m/%d/")
+    filename = models.CharField(max_length=255, blank=True)
+    delimiter = models.CharField(max_length=1, default=";")
+    update_existing = models.BooleanField(default=False)
+
+    status = models.CharField(max_length=20, choices=ImportJobStatus.choices, default=ImportJobStatus.PENDING)
+    total_rows = models.PositiveIntegerField(null=True, blank=True)
+    # номер последней строки файла, результат которой уже записан
+    processed_row = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    unchanged_count = models.PositiveIntegerField(default=0)
+    # [[номер строки, текст ошибки], ...] — не больше IMPORT_JOB_MAX_ERRORS, всего ошибок — error_count
+    errors = models.JSONField(default=list, blank=True)
+    error_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    # сколько раз задание забирал воркер; после IMPORT_JOB_MAX_ATTEMPTS оно не перезапускается
+    attempts = models.PositiveIntegerField(default=0)
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="import_jobs",
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Импорт CSV"
+        verbose_name_plural = "Импорты CSV"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "heartbeat_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} — {self.get_status_display()} — {self.created_at:%Y-%m-%d %H:%M}"
+
+    @property
+    def is_finished(self):
+        return self.status in (ImportJobStatus.DONE, ImportJobStatus.FAILED)
+
+    @property
+    def progress(self):
+        """Процент обработанных строк (строки данных начинаются со второй)."""
+        if not self.total_rows:
+            return 100 if self.is_finished else 0
+        return min(100, round(max(self.processed_row - 1, 0) * 100 / self.total_rows))
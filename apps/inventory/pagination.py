@@ -0,0 +1,157 @@
+import base64
+import binascii
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _split_ordering(ordering):
+    fields = []
+    for item in ordering:
+        desc = item.startswith("-")
+        fields.append((item.lstrip("-"), desc))
+    return fields
+
+
+def _seek_q(fields, values, forward=True):
+    """
+    Условие "строго после курсора" для сортировки fields:
+      (a, b) после (x, y)  <=>  a > x  OR  (a = x AND b > y)
+    Для desc-полей знак сравнения меняется. forward=False — "строго до курсора".
+    """
+    q = Q()
+    for i, (name, desc) in enumerate(fields):
+        lookup = "lt" if desc == forward else "gt"
+        cond = Q(**{f"{name}__{lookup}": values[i]})
+        for j in range(i):
+            cond &= Q(**{fields[j][0]: values[j]})
+        q |= cond
+    return q
+
+
+class KeysetPage:
+    """
+    Страница keyset-пагинации. Совместима с тем, что шаблоны ждут от page_obj
+    (итерация, has_next/has_previous), но без номера страницы и общего количества.
+    """
+
+    def __init__(self, object_list, paginator, *, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __repr__(self):
+        return f"<KeysetPage {len(self)} items>"
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return ""
+        return self.paginator.encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return ""
+        return self.paginator.encode_cursor(self.object_list[0])
+
+
+class KeysetPaginator:
+    """
+    Seek-пагинация: вместо OFFSET берём строки "после последней показанной"
+    по составному ключу (created_at, id). Время выборки не зависит от глубины,
+    COUNT(*) не выполняется.
+    """
+
+    def __init__(self, queryset, per_page, ordering=("-created_at", "-id")):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = _split_ordering(self.ordering)
+
+    # --- курсор ---
+
+    def encode_cursor(self, obj):
+        # obj — экземпляр модели или словарь из values()
+        parts = []
+        for name, _ in self.fields:
+            value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+            parts.append(value.isoformat() if hasattr(value, "isoformat") else str(value))
+        raw = "|".join(parts).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        except (binascii.Error, UnicodeError, ValueError):
+            raise InvalidCursor(cursor)
+
+        parts = raw.split("|")
+        if len(parts) != len(self.fields):
+            raise InvalidCursor(cursor)
+
+        model = self.queryset.model
+        values = []
+        try:
+            for (name, _), part in zip(self.fields, parts):
+                values.append(model._meta.get_field(name).to_python(part))
+        except Exception:
+            raise InvalidCursor(cursor)
+        return values
+
+    # --- выборка ---
+
+    def page(self, cursor=None, direction="next"):
+        qs = self.queryset
+        backwards = direction == "prev" and bool(cursor)
+
+        if cursor:
+            values = self.decode_cursor(cursor)
+            qs = qs.filter(_seek_q(self.fields, values, forward=not backwards))
+
+        if backwards:
+            reverse = tuple(name if desc else f"-{name}" for name, desc in self.fields)
+            rows = list(qs.order_by(*reverse)[: self.per_page + 1])
+            has_more = len(rows) > self.per_page
+            rows = rows[: self.per_page]
+            rows.reverse()
+            return KeysetPage(rows, self, has_next=True, has_previous=has_more)
+
+        rows = list(qs.order_by(*self.ordering)[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        return KeysetPage(rows[: self.per_page], self, has_next=has_more, has_previous=bool(cursor))
+
+
+def iter_keyset(queryset, chunk_size=1000, ordering=("-created_at", "-id")):
+    """
+    Обходит весь queryset порциями по chunk_size через seek-условие.
+    Для PDF/CSV: каждая порция — короткий индексный запрос, без OFFSET.
+    """
+    paginator = KeysetPaginator(queryset, chunk_size, ordering=ordering)
+    cursor = None
+    while True:
+        page = paginator.page(cursor)
+        yield from page.object_list
+        if not page.has_next():
+            return
+        cursor = page.next_cursor
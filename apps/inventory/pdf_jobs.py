@@ -0,0 +1,167 @@
+"""
+Фоновые PDF-отчёты. PDF-view ставит PdfJob в очередь Celery и перенаправляет
+на страницу статуса; задача выполняет тот же view в воркере и кладёт файл в MEDIA.
+Задание упавшего воркера (или с потерянным сообщением) перезапускается
+по устаревшему heartbeat_at — как импорт CSV (см. import_jobs).
+"""
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import F, Q
+from django.http import HttpRequest, HttpResponse, QueryDict
+from django.shortcuts import redirect
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from config.pdf import render_pdf_bytes
+from .models import PdfJob, PdfJobStatus
+
+# kind задания -> PDF-view, который умеет get_pdf_document()
+PDF_JOB_VIEWS = {
+    "equipment_list": "apps.inventory.views.EquipmentListPdfView",
+    "employee_list": "apps.directory.views.EmployeeListPdfView",
+    "equipment_labels": "apps.inventory.views.EquipmentLabelsPdfView",
+}
+
+
+class PdfJobMixin:
+    """
+    Для PDF-view. Подкласс обязан определить get_pdf_document() -> (шаблон, контекст,
+    имя файла) для self.request; хук вызывается и в запросе, и в воркере (см. render_job_pdf).
+    При settings.PDF_ASYNC GET не рендерит PDF сам, а создаёт PdfJob.
+    """
+    pdf_job_kind = None
+    # CSS из статики, разбираются рендерером один раз на процесс
+    pdf_stylesheets = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # ошибка при импорте модуля, а не 500 на первом запросе (или FAILED в воркере)
+        if not callable(getattr(cls, "get_pdf_document", None)):
+            raise ImproperlyConfigured(f"{cls.__name__} должен определить get_pdf_document()")
+
+    def render_pdf_document(self, base_url=None):
+        """
+        (байты PDF, имя файла). Переопределяется, если нужен другой способ рендера
+        (например, по частям для больших списков).
+        """
+        template_name, context, filename = self.get_pdf_document()
+        pdf = render_pdf_bytes(
+            template_name, context, request=self.request, base_url=base_url, stylesheets=self.pdf_stylesheets,
+        )
+        return pdf, filename
+
+    def use_pdf_job(self):
+        """Рендерить ли в Celery; view может сузить условие (например, по размеру выборки)."""
+        return bool(self.pdf_job_kind) and getattr(settings, "PDF_ASYNC", False)
+
+    def get(self, request, *args, **kwargs):
+        if self.use_pdf_job():
+            job = enqueue_pdf_job(self.pdf_job_kind, request)
+            return redirect("inventory:pdf_job_detail", pk=job.pk)
+
+        pdf, filename = self.render_pdf_document()
+        resp = HttpResponse(pdf, content_type="application/pdf")
+        resp["Content-Disposition"] = f'inline; filename="{filename}"'
+        return resp
+
+
+def enqueue_pdf_job(kind, request):
+    from .tasks import render_pdf_job
+
+    job = PdfJob.objects.create(
+        kind=kind,
+        params=request.GET.urlencode(),
+        base_url=request.build_absolute_uri("/"),
+        created_by=request.user,
+    )
+    transaction.on_commit(lambda: render_pdf_job.delay(str(job.pk)))
+    return job
+
+
+def stale_after():
+    return timedelta(seconds=getattr(settings, "PDF_JOB_STALE", 30 * 60))
+
+
+def max_attempts():
+    return getattr(settings, "PDF_JOB_MAX_ATTEMPTS", 3)
+
+
+def stale_jobs_q(now=None):
+    """Задания, которые никто не выполняет: не взятые из очереди или с упавшим воркером."""
+    border = (now or timezone.now()) - stale_after()
+    return (
+        Q(status=PdfJobStatus.PENDING, created_at__lt=border)
+        | Q(status=PdfJobStatus.RUNNING, heartbeat_at__lt=border)
+        | Q(status=PdfJobStatus.RUNNING, heartbeat_at__isnull=True)
+    )
+
+
+def claim_pdf_job(job_id):
+    """
+    Забирает задание атомарно: новое или брошенное упавшим воркером, если попытки
+    не исчерпаны. Возвращает PdfJob или None, если задание уже выполняется/завершено.
+    """
+    now = timezone.now()
+    claimable = (Q(status=PdfJobStatus.PENDING) | stale_jobs_q(now)) & Q(attempts__lt=max_attempts())
+    taken = PdfJob.objects.filter(claimable, pk=job_id).update(
+        status=PdfJobStatus.RUNNING, heartbeat_at=now, attempts=F("attempts") + 1,
+    )
+    if not taken:
+        return None
+    return PdfJob.objects.select_related("created_by").get(pk=job_id)
+
+
+def fail_exhausted_jobs(ttl, now=None):
+    """Брошенные задания, исчерпавшие PDF_JOB_MAX_ATTEMPTS, — в FAILED (иначе их перезапускали бы вечно)."""
+    now = now or timezone.now()
+    return PdfJob.objects.filter(stale_jobs_q(now), attempts__gte=max_attempts()).update(
+        status=PdfJobStatus.FAILED,
+        error="Формирование PDF прерывалось несколько раз подряд и остановлено.",
+        finished_at=now,
+        expires_at=now + ttl,
+    )
+
+
+def finish_pdf_job(job, ttl, **fields):
+    """
+    Сохраняет итог, только если задание всё ещё за этим воркером (heartbeat_at не сменился);
+    файл хранится ttl. False — задание перехватил другой воркер.
+    """
+    now = timezone.now()
+    fields.update(finished_at=now, expires_at=now + ttl)
+    return bool(
+        PdfJob.objects.filter(pk=job.pk, status=PdfJobStatus.RUNNING, heartbeat_at=job.heartbeat_at).update(**fields)
+    )
+
+
+def build_job_request(job):
+    """
+    HttpRequest для выполнения PDF-view в воркере: GET-параметры и пользователь задания
+    (от пользователя зависит область видимости организаций).
+    """
+    request = HttpRequest()
+    request.method = "GET"
+    request.GET = QueryDict(job.params)
+    request.user = job.created_by
+
+    parts = urlsplit(job.base_url or "http://localhost/")
+    request.META["HTTP_HOST"] = parts.netloc or "localhost"
+    request.META["SERVER_NAME"] = parts.hostname or "localhost"
+    request.META["SERVER_PORT"] = str(parts.port or (443 if parts.scheme == "https" else 80))
+    return request
+
+
+def render_job_pdf(job):
+    """
+    Возвращает (байты PDF, имя файла) для задания.
+    """
+    view_class = import_string(PDF_JOB_VIEWS[job.kind])
+    request = build_job_request(job)
+
+    view = view_class()
+    view.setup(request)
+    return view.render_pdf_document(base_url=job.base_url or None)
@@ -0,0 +1,112 @@
+"""
+QR-коды оборудования. В QR зашита ссылка на бота с qr_token — она зависит только
+от токена (и имени бота), поэтому PNG кэшируется по хэшу ссылки на QR_CACHE_TIMEOUT
+(записи удалённого оборудования истекают сами), SVG — в LRU процесса, а картинки
+можно строить пачкой и встраивать прямо в страницу.
+"""
+import base64
+import hashlib
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+
+QR_CACHE_PREFIX = "qr-png:"
+
+# ?format= у картинки QR
+QR_FORMATS = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+
+def qr_url(token):
+    """Что зашито в QR: ссылка на бота с токеном оборудования."""
+    return f"https://t.me/{settings.TELEGRAM_BOT_USERNAME}?start={token}"
+
+
+def render_qr(url, fmt="png"):
+    """Кодирует url в картинку; без обращения к settings/кэшу (годится для пула процессов)."""
+    import qrcode
+
+    buf = BytesIO()
+    if fmt == "svg":
+        from qrcode.image.svg import SvgPathImage
+
+        qrcode.make(url, image_factory=SvgPathImage).save(buf)
+    else:
+        qrcode.make(url).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def qr_png(token):
+    return render_qr(qr_url(token), "png")
+
+
+@lru_cache(maxsize=4096)
+def _svg_for_url(url):
+    return render_qr(url, "svg")
+
+
+def qr_svg(token):
+    """
+    Векторный QR: меньше PNG, чётче на термоэтикетке, WeasyPrint не декодирует растр.
+    Строится быстро, поэтому держится только в LRU процесса (ключ — ссылка с токеном).
+    """
+    return _svg_for_url(qr_url(token))
+
+
+def qr_digest(token):
+    """Хэш содержимого QR: ключ кэша и ETag."""
+    return hashlib.sha1(qr_url(token).encode("utf-8")).hexdigest()
+
+
+def _cache_timeout():
+    return getattr(settings, "QR_CACHE_TIMEOUT", 7 * 24 * 60 * 60)
+
+
+def cached_qr_png(token):
+    key = QR_CACHE_PREFIX + qr_digest(token)
+    png = cache.get(key)
+    if png is None:
+        png = qr_png(token)
+        cache.set(key, png, timeout=_cache_timeout())
+    return png
+
+
+def warm_qr_cache(tokens):
+    """Заранее кладёт PNG в кэш (новое оборудование, импорт)."""
+    tokens = [t for t in tokens if t]
+    keys = {QR_CACHE_PREFIX + qr_digest(t): t for t in tokens}
+    present = cache.get_many(list(keys))
+    missing = {key: qr_png(token) for key, token in keys.items() if key not in present}
+    if missing:
+        cache.set_many(missing, timeout=_cache_timeout())
+    return len(missing)
+
+
+def qr_image(token, fmt="png"):
+    """Байты картинки в формате fmt (ключ QR_FORMATS)."""
+    if fmt == "svg":
+        return qr_svg(token)
+    return cached_qr_png(token)
+
+
+def qr_data_uri(token, fmt="png"):
+    data = base64.b64encode(qr_image(token, fmt)).decode("ascii")
+    return f"data:{QR_FORMATS[fmt]};base64,{data}"
+
+
+def attach_qr_images(objects, fmt="svg"):
+    """
+    Проставляет obj.qr_src (data URI) каждому объекту: вся партия этикеток
+    отдаётся одним ответом, без отдельного запроса на каждую картинку.
+    """
+    seen = {}
+    for obj in objects:
+        token = obj.qr_token
+        if token not in seen:
+            seen[token] = qr_data_uri(token, fmt)
+        obj.qr_src = seen[token]
+    return objects
@@ -0,0 +1,134 @@
+"""
+ZIP с QR-кодами по выборке оборудования (первичная маркировка площадки).
+Картинки кодируются в пуле процессов порциями, архив пишется потоком:
+в памяти — только порции в работе, а не весь архив.
+"""
+import itertools
+import multiprocessing
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .qr import QR_CACHE_PREFIX, qr_digest, qr_url, render_qr
+
+_UNSAFE_NAME = re.compile(r'[\\/:*?"<>|\s]+')
+
+
+class _ZipSink:
+    """Несжимаемый поток для ZipFile: собирает записанное до следующего pop()."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _render_batch(urls, fmt):
+    # выполняется в процессе пула
+    return [render_qr(url, fmt) for url in urls]
+
+
+def _archive_workers():
+    # пул создаётся на каждую выгрузку в процессе веб-сервера — держим его маленьким
+    workers = min(getattr(settings, "QR_ARCHIVE_WORKERS", 2), os.cpu_count() or 1)
+    # в демоническом процессе (prefork Celery) свой пул создавать нельзя
+    if multiprocessing.current_process().daemon:
+        return 1
+    return max(workers, 1)
+
+
+def _file_names(rows, fmt):
+    """Имя файла по инвентарному номеру; без номера или при повторе — с id."""
+    used = set()
+    for pk, inventory_number, token in rows:
+        base = _UNSAFE_NAME.sub("_", (inventory_number or "").strip()).strip("._")
+        name = base or f"id-{pk}"
+        if name.lower() in used:
+            name = f"{name}-{pk}"
+        used.add(name.lower())
+        yield f"{name}.{fmt}", token
+
+
+def _batches(names, size):
+    batch = []
+    for item in names:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _with_cached_png(batch):
+    """Для PNG часть картинок уже лежит в кэше (см. qr.cached_qr_png)."""
+    keys = [QR_CACHE_PREFIX + qr_digest(token) for _, token in batch]
+    found = cache.get_many(keys)
+    return [found.get(key) for key in keys]
+
+
+def iter_qr_zip(queryset, fmt="png", batch_size=200):
+    """
+    Части ZIP-архива с QR-кодами queryset оборудования. Имена файлов — инвентарные номера.
+    """
+    rows = queryset.order_by("inventory_number", "pk").values_list("pk", "inventory_number", "qr_token")
+    batches = _batches(_file_names(rows.iterator(chunk_size=batch_size * 5), fmt), batch_size)
+
+    sink = _ZipSink()
+    # QR и так сжат (PNG) или мал (SVG) — храним без сжатия, это быстрее
+    archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED)
+
+    def write_batch(batch, images):
+        for (name, _), image in zip(batch, images):
+            archive.writestr(name, image)
+        return sink.pop()
+
+    def prepare(batch):
+        cached = _with_cached_png(batch) if fmt == "png" else [None] * len(batch)
+        todo = [qr_url(token) for (_, token), image in zip(batch, cached) if image is None]
+        return cached, todo
+
+    def fill(cached, rendered):
+        rendered = iter(rendered)
+        return [image if image is not None else next(rendered) for image in cached]
+
+    # архив в одну порцию не стоит запуска процессов
+    first = next(batches, None)
+    second = next(batches, None)
+    batches = itertools.chain(filter(None, (first, second)), batches)
+
+    workers = _archive_workers() if second else 1
+    if workers <= 1:
+        for batch in batches:
+            cached, todo = prepare(batch)
+            yield write_batch(batch, fill(cached, _render_batch(todo, fmt)))
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            # порядок файлов сохраняем, в работе — не больше двух порций на процесс
+            pending = []
+            for batch in batches:
+                cached, todo = prepare(batch)
+                pending.append((batch, cached, pool.submit(_render_batch, todo, fmt)))
+                if len(pending) >= workers * 2:
+                    done, cached_done, future = pending.pop(0)
+                    yield write_batch(done, fill(cached_done, future.result()))
+            for done, cached_done, future in pending:
+                yield write_batch(done, fill(cached_done, future.result()))
+
+    archive.close()
+    yield sink.pop()
@@ -0,0 +1,220 @@
+"""
+Полнотекстовый поиск по оборудованию.
+
+SQLite: FTS5-таблица inventory_equipment_fts (rowid = Equipment.id), ранжирование bm25.
+PostgreSQL: GIN-индекс по выражению to_tsvector('simple', ...), ранжирование ts_rank.
+Если индекс недоступен — прежний поиск через icontains.
+"""
+import re
+
+from django.db import connections, router
+from django.db.models import BooleanField, F, FloatField, Func, Q
+from django.db.models.expressions import RawSQL
+
+from apps.directory.normalize import normalize_search
+
+FTS_TABLE = "inventory_equipment_fts"
+PG_INDEX = "inventory_equipment_search_idx"
+SEARCH_FIELDS = ("name", "inventory_number", "serial_number", "model", "specs", "cpu", "print_format")
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_available = {}
+
+
+def _db_alias():
+    from apps.inventory.models import Equipment
+    return router.db_for_read(Equipment)
+
+
+def _table():
+    from apps.inventory.models import Equipment
+    return Equipment._meta.db_table
+
+
+def _sqlite_columns_expr(table):
+    # ё -> е, остальное (регистр) нормализует токенизатор unicode61
+    return ", ".join(
+        f"replace(replace(coalesce({table}.{f}, ''), 'ё', 'е'), 'Ё', 'Е')" for f in SEARCH_FIELDS
+    )
+
+
+def _pg_document_expr(table):
+    doc = " || ' ' || ".join(f"coalesce({table}.{f}, '')" for f in SEARCH_FIELDS)
+    return f"to_tsvector('simple', translate({doc}, 'ёЁ', 'еЕ'))"
+
+
+def tokenize(value):
+    value = (value or "").replace("ё", "е").replace("Ё", "Е")
+    return _TOKEN_RE.findall(value)
+
+
+def is_available(using=None):
+    using = using or _db_alias()
+    if using in _available:
+        return _available[using]
+
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        result = True
+    elif connection.vendor == "sqlite":
+        result = FTS_TABLE in connection.introspection.table_names()
+    else:
+        result = False
+
+    _available[using] = result
+    return result
+
+
+def ensure_search_index(using=None):
+    """
+    Создаёт поисковый индекс, если его ещё нет. Возвращает True, если индекс был создан
+    (значит, его нужно заполнить через rebuild_search_index).
+    """
+    using = using or _db_alias()
+    connection = connections[using]
+    table = _table()
+    _available.pop(using, None)
+
+    if connection.vendor == "sqlite":
+        if FTS_TABLE in connection.introspection.table_names():
+            return False
+        columns = ", ".join(SEARCH_FIELDS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                f"{columns}, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+        return True
+
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON {table} USING GIN ({_pg_document_expr(table)})"
+            )
+        return False
+
+    return False
+
+
+def rebuild_search_index(using=None):
+    using = using or _db_alias()
+    connection = connections[using]
+    if connection.vendor != "sqlite" or not is_available(using):
+        return
+
+    table = _table()
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}(rowid, {', '.join(SEARCH_FIELDS)}) "
+            f"SELECT {table}.id, {_sqlite_columns_expr(table)} FROM {table}"
+        )
+
+
+def index_equipment(ids, using=None):
+    """
+    Обновляет строки индекса для указанных Equipment.id.
+    Вызывается из post_save и после bulk_create/bulk_update в импорте.
+    """
+    ids = [int(i) for i in ids if i is not None]
+    using = using or _db_alias()
+    if not ids or connections[using].vendor != "sqlite" or not is_available(using):
+        return
+
+    table = _table()
+    placeholders = ", ".join(["%s"] * len(ids))
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", ids)
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}(rowid, {', '.join(SEARCH_FIELDS)}) "
+            f"SELECT {table}.id, {_sqlite_columns_expr(table)} FROM {table} "
+            f"WHERE {table}.id IN ({placeholders})",
+            ids,
+        )
+
+
+def unindex_equipment(ids, using=None):
+    ids = [int(i) for i in ids if i is not None]
+    using = using or _db_alias()
+    if not ids or connections[using].vendor != "sqlite" or not is_available(using):
+        return
+
+    placeholders = ", ".join(["%s"] * len(ids))
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", ids)
+
+
+def _icontains_q(value):
+    return (
+        Q(name_norm__contains=normalize_search(value))
+        | Q(inventory_number__icontains=value)
+        | Q(serial_number__icontains=value)
+        | Q(model__icontains=value)
+        | Q(specs__icontains=value)
+        | Q(cpu__icontains=value)
+        | Q(print_format__icontains=value)
+    )
+
+
+class _MatchRank(Func):
+    """bm25 строки из FTS для pk; NULL — строка не нашлась в FTS."""
+
+    output_field = FloatField()
+
+    def __init__(self, expression, match):
+        super().__init__(expression)
+        self.match = match
+
+    def as_sql(self, compiler, connection):
+        pk_sql, pk_params = compiler.compile(self.get_source_expressions()[0])
+        return (
+            f"(SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = {pk_sql})",
+            [self.match, *pk_params],
+        )
+
+
+def _match_q(match):
+    return Q(pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]))
+
+
+def _code_q(value):
+    # слова ищутся по префиксу; фрагмент из середины номера ("012" в INV-00012)
+    # находится подстрокой по инвентарному и серийному номерам
+    return Q(inventory_number__icontains=value) | Q(serial_number__icontains=value)
+
+
+def search_equipment(queryset, value):
+    """
+    Фильтрует queryset оборудования по строке поиска и добавляет аннотацию search_rank
+    (больше — релевантнее). Каждое слово ищется как префикс, слова объединяются по AND;
+    инвентарный и серийный номера, кроме того, — подстрокой.
+    """
+    value = (value or "").strip()
+    tokens = tokenize(value)
+    if not tokens:
+        return queryset
+
+    using = queryset.db
+    if not is_available(using):
+        return queryset.filter(_icontains_q(value))
+
+    vendor = connections[using].vendor
+    table = queryset.model._meta.db_table
+
+    if vendor == "sqlite":
+        match = " ".join('"%s"*' % t for t in tokens)
+        return queryset.filter(_match_q(match) | _code_q(value)).annotate(
+            search_rank=_MatchRank(F("pk"), match)
+        )
+
+    tsquery = " & ".join(f"{t}:*" for t in tokens)
+    doc = _pg_document_expr(table)
+    return queryset.filter(
+        Q(RawSQL(f"{doc} @@ to_tsquery('simple', %s)", [tsquery], output_field=BooleanField()))
+        | _code_q(value)
+    ).annotate(
+        search_rank=RawSQL(
+            f"ts_rank({doc}, to_tsquery('simple', %s))", [tsquery], output_field=FloatField()
+        )
+    )
@@ -1,54 +1,84 @@
-from django.db import transaction
+from django.db import models, transaction
 from django.utils import timezone
 
-from apps.inventory.models import InventoryDocument, DocumentType, EquipmentStatus, EquipmentEvent, EquipmentEventType
+from apps.inventory.models import (
+    InventoryDocument, DocumentType, Equipment, EquipmentStatus, EquipmentEvent, EquipmentEventType)
+from config.counting import bump_count_version
 
 
-def apply_document(doc: InventoryDocument):
+class ApplyStatus(models.TextChoices):
+    """Итог apply_document; label — текст сообщения пользователю."""
+    APPLIED = "applied", "Документ применен."
+    ALREADY_APPLIED = "already_applied", "Документ уже был применен."
+    EMPTY = "empty", "В документе нет строк — применять нечего."
+
+
+def apply_document(doc: InventoryDocument, user=None):
     """
     Применяет документ к оборудованию:
       - TRANSFER: assigned_to = doc.to_employee
       - WRITE_OFF: status = WRITTEN_OFF и снимаем закрепление
-    Создает EquipmentEvent на каждую строку.
+    Создает EquipmentEvent на каждую строку. Запросов — постоянное число, а не
+    по два на строку: оборудование читается одним запросом с блокировкой,
+    пишется одним UPDATE (новые значения у всех строк одинаковые), события —
+    одним bulk_create.
+    Возвращает ApplyStatus. Документ без строк не применяется (applied_at не ставится).
     """
-    if doc.applied_at:
-        return  # уже применен
-
     with transaction.atomic():
-        for line in doc.lines.select_related("equipment"):
-            eq = line.equipment
+        # блокировка документа: два одновременных запроса не применят его дважды
+        locked = InventoryDocument.objects.select_for_update().get(pk=doc.pk)
+        if locked.applied_at:
+            doc.applied_at = locked.applied_at
+            return ApplyStatus.ALREADY_APPLIED
 
-            if doc.doc_type == DocumentType.TRANSFER:
-                from_emp = eq.assigned_to
-                eq.assigned_to = doc.to_employee
-                eq.status = EquipmentStatus.IN_USE
-                eq.save()
+        equipment = Equipment.objects.filter(pk__in=doc.lines.values("equipment_id"))
+        # прежние закрепление и статус — для событий
+        items = list(equipment.select_for_update().order_by("pk").values_list("pk", "assigned_to_id", "status"))
+        if not items:
+            return ApplyStatus.EMPTY
 
-                EquipmentEvent.objects.create(
-                    equipment=eq,
+        if doc.doc_type == DocumentType.TRANSFER:
+            changes = {"assigned_to": doc.to_employee, "status": EquipmentStatus.IN_USE}
+        elif doc.doc_type == DocumentType.WRITE_OFF:
+            changes = {"assigned_to": None, "status": EquipmentStatus.WRITTEN_OFF}
+        else:
+            changes = {}
+
+        now = timezone.now()
+        events = []
+        for eq_id, from_emp_id, old in items:
+            if doc.doc_type == DocumentType.TRANSFER:
+                events.append(EquipmentEvent(
+                    equipment_id=eq_id,
                     event_type=EquipmentEventType.ASSIGN,
-                    from_employee=from_emp,
+                    created_at=now,
+                    created_by=user,
+                    from_employee_id=from_emp_id,
                     to_employee=doc.to_employee,
                     document_number=doc.number,
                     comment="Передача по акту",
-                )
+                ))
 
             elif doc.doc_type == DocumentType.WRITE_OFF:
-                old = eq.status
-                from_emp = eq.assigned_to
-                eq.assigned_to = None
-                eq.status = EquipmentStatus.WRITTEN_OFF
-                eq.save()
-
-                EquipmentEvent.objects.create(
-                    equipment=eq,
+                events.append(EquipmentEvent(
+                    equipment_id=eq_id,
                     event_type=EquipmentEventType.WRITE_OFF,
-                    from_employee=from_emp,
+                    created_at=now,
+                    created_by=user,
+                    from_employee_id=from_emp_id,
                     old_status=old,
                     new_status=EquipmentStatus.WRITTEN_OFF,
                     document_number=doc.number,
                     comment="Списано по акту",
-                )
+                ))
+
+        if changes:
+            # import_hash — как при save(): строка разошлась с последним импортом
+            equipment.update(**changes, updated_at=now, import_hash="")
+            EquipmentEvent.objects.bulk_create(events)
+            # update() идет в обход сигналов; поиск от статуса и закрепления не зависит
+            transaction.on_commit(lambda: bump_count_version(Equipment))
 
-        doc.applied_at = timezone.now()
-        doc.save(update_fields=["applied_at"])
\ No newline at end of file
+        doc.applied_at = now
+        doc.save(update_fields=["applied_at"])
+    return ApplyStatus.APPLIED
@@ -0,0 +1,53 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.directory.normalize import backfill_normalized_fields
+
+from apps.inventory.act_pdf import invalidate_act_pdfs
+from apps.inventory.models import Equipment, InventoryDocument, InventoryDocumentLine
+from apps.inventory.qr import warm_qr_cache
+from apps.inventory.search import (
+    ensure_search_index, index_equipment, rebuild_search_index, unindex_equipment)
+from config.counting import bump_count_version
+
+
+@receiver([post_save, post_delete], sender=Equipment)
+def equipment_changed(sender, **kwargs):
+    bump_count_version(Equipment)
+
+
+@receiver(post_save, sender=Equipment)
+def equipment_saved_index(sender, instance, **kwargs):
+    index_equipment([instance.pk])
+
+
+@receiver(post_save, sender=Equipment)
+def equipment_created_qr(sender, instance, created, **kwargs):
+    # QR зависит только от qr_token — генерируем сразу, к первому показу он уже в кэше
+    if created:
+        token = instance.qr_token
+        transaction.on_commit(lambda: warm_qr_cache([token]), robust=True)
+
+
+@receiver(post_delete, sender=Equipment)
+def equipment_deleted_index(sender, instance, **kwargs):
+    unindex_equipment([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=InventoryDocument)
+def document_changed(sender, instance, **kwargs):
+    invalidate_act_pdfs(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=InventoryDocumentLine)
+def document_line_changed(sender, instance, **kwargs):
+    invalidate_act_pdfs(instance.document_id)
+
+
+def create_search_index(sender, using="default", apps=None, **kwargs):
+    # name_norm добавлен миграцией пустым — заполняем до индексации
+    backfill_normalized_fields(Equipment, using, apps)
+    # миграций для виртуальной FTS-таблицы нет — создаём после migrate
+    if ensure_search_index(using):
+        rebuild_search_index(using)
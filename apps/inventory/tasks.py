@@ -0,0 +1,139 @@
+import logging
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ImportJob, ImportJobStatus, PdfJob, PdfJobStatus
+
+logger = logging.getLogger(__name__)
+
+
+def _job_ttl():
+    return timedelta(seconds=getattr(settings, "PDF_JOB_TTL", 24 * 60 * 60))
+
+
+# acks_late: сообщение подтверждается после выполнения — при падении воркера задание вернётся в очередь
+@shared_task(ignore_result=True, acks_late=True, reject_on_worker_lost=True)
+def render_pdf_job(job_id):
+    from .pdf_jobs import claim_pdf_job, finish_pdf_job, render_job_pdf
+
+    # забираем задание атомарно: повторная доставка сообщения не запустит рендер дважды
+    job = claim_pdf_job(job_id)
+    if job is None:
+        return
+
+    try:
+        pdf, filename = render_job_pdf(job)
+    except Exception as exc:
+        logger.exception("PDF job %s failed", job_id)
+        finish_pdf_job(job, _job_ttl(), status=PdfJobStatus.FAILED, error=str(exc) or exc.__class__.__name__)
+        return
+
+    job.file.save(f"{job.pk}.pdf", ContentFile(pdf), save=False)
+    if not finish_pdf_job(job, _job_ttl(), status=PdfJobStatus.DONE, file=job.file.name, filename=filename):
+        logger.warning("PDF job %s was taken over by another worker", job_id)
+        job.file.delete(save=False)
+
+
+@shared_task
+def resume_pdf_jobs():
+    """
+    Перезапускает брошенные PDF-задания (celery beat): воркер упал, сообщение потерялось.
+    Исчерпавшие попытки — в FAILED.
+    """
+    from .pdf_jobs import fail_exhausted_jobs, stale_jobs_q
+
+    now = timezone.now()
+    failed = fail_exhausted_jobs(_job_ttl(), now)
+    if failed:
+        logger.warning("%s PDF jobs exceeded PDF_JOB_MAX_ATTEMPTS", failed)
+    ids = list(PdfJob.objects.filter(stale_jobs_q(now)).values_list("pk", flat=True))
+    for job_id in ids:
+        render_pdf_job.delay(str(job_id))
+    return len(ids)
+
+
+@shared_task
+def cleanup_pdf_jobs():
+    """
+    Удаляет просроченные задания вместе с файлами (запускается celery beat).
+    Зависшие без expires_at удаляются по created_at.
+    """
+    now = timezone.now()
+    stale = Q(expires_at__lt=now) | Q(expires_at__isnull=True, created_at__lt=now - _job_ttl())
+
+    removed = 0
+    for job in PdfJob.objects.filter(stale).iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        removed += 1
+    return removed
+
+
+@shared_task(ignore_result=True)
+def warm_qr_codes(tokens):
+    """QR новых единиц в кэш (импорт создаёт их через bulk_create, без post_save)."""
+    from .qr import warm_qr_cache
+
+    warm_qr_cache(tokens)
+
+
+# acks_late: сообщение подтверждается после выполнения — при падении воркера задание вернётся в очередь
+@shared_task(ignore_result=True, acks_late=True, reject_on_worker_lost=True)
+def run_import_job(job_id):
+    from .import_jobs import ImportJobTakenOver, claim_import_job, execute_import_job
+
+    job = claim_import_job(job_id)
+    if job is None:
+        return
+
+    try:
+        execute_import_job(job)
+    except ImportJobTakenOver:
+        logger.warning("Import job %s was taken over by another worker", job_id)
+    except Exception as exc:
+        logger.exception("Import job %s failed", job_id)
+        ImportJob.objects.filter(pk=job_id, status=ImportJobStatus.RUNNING).update(
+            status=ImportJobStatus.FAILED,
+            error=str(exc) or exc.__class__.__name__,
+            finished_at=timezone.now(),
+        )
+
+
+@shared_task
+def resume_import_jobs():
+    """
+    Перезапускает брошенные задания импорта (celery beat): воркер упал, сообщение потерялось.
+    Продолжение идёт с последней записанной порции; исчерпавшие попытки — в FAILED.
+    """
+    from .import_jobs import fail_exhausted_jobs, stale_jobs_q
+
+    now = timezone.now()
+    failed = fail_exhausted_jobs(now)
+    if failed:
+        logger.warning("%s import jobs exceeded IMPORT_JOB_MAX_ATTEMPTS", failed)
+    ids = list(ImportJob.objects.filter(stale_jobs_q(now)).values_list("pk", flat=True))
+    for job_id in ids:
+        run_import_job.delay(str(job_id))
+    return len(ids)
+
+
+@shared_task
+def cleanup_import_jobs():
+    """Удаляет завершённые задания импорта старше IMPORT_JOB_TTL вместе с загруженными файлами."""
+    border = timezone.now() - timedelta(seconds=getattr(settings, "IMPORT_JOB_TTL", 7 * 24 * 60 * 60))
+    removed = 0
+    finished = ImportJob.objects.filter(
+        status__in=[ImportJobStatus.DONE, ImportJobStatus.FAILED], finished_at__lt=border,
+    )
+    for job in finished.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        removed += 1
+    return removed
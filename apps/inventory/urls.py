@@ -12,9 +12,14 @@ urlpatterns = [
     path("equipment/<int:pk>/", views.EquipmentDetailView.as_view(), name="equipment_detail"),
     # path("equipment/print/", views.EquipmentPrintView.as_view(), name="equipment_print"),
     path("equipment/pdf/", views.EquipmentListPdfView.as_view(), name="equipment_list_pdf"),
+    path("equipment/export/", views.EquipmentListExportView.as_view(), name="equipment_list_export"),
+    path("equipment/export/qr.zip", views.EquipmentQrArchiveView.as_view(), name="equipment_qr_archive"),
     path("equipment/import/csv/template/", views.equipment_csv_template, name="equipment_csv_template"),
     path("equipment/import/csv/", views.EquipmentImportCsvView.as_view(), name="equipment_import_csv"),
+    path("equipment/import/jobs/<uuid:pk>/", views.ImportJobDetailView.as_view(), name="import_job_detail"),
+    path("equipment/import/jobs/<uuid:pk>/status/", views.import_job_status, name="import_job_status"),
     path("equipment/labels/selected/",views.equipment_qr_labels_selected, name="equipment_qr_labels_selected"),
+    path("equipment/labels/print/", views.equipment_labels_print, name="equipment_labels_print"),
 
 
     path("equipment/<int:pk>/qr.png", views.equipment_qr_png, name="equipment_qr_png"),
@@ -22,9 +27,14 @@ urlpatterns = [
 
     path("documents/<int:pk>/", views.DocumentDetailView.as_view(), name="document_detail"),
     path("documents/<int:pk>/pdf/", views.DocumentPdfView.as_view(), name="document_pdf"),
-    # path("documents/<int:pk>/apply/", views.apply_document_view, name="document_apply"),
+    path("documents/<int:pk>/apply/", views.apply_document_view, name="document_apply"),
+
+    path("pdf-jobs/<uuid:pk>/", views.PdfJobDetailView.as_view(), name="pdf_job_detail"),
+    path("pdf-jobs/<uuid:pk>/status/", views.pdf_job_status, name="pdf_job_status"),
+    path("pdf-jobs/<uuid:pk>/download/", views.pdf_job_download, name="pdf_job_download"),
 
     path("ajax/employees/", views.EmployeesByOrganizationView.as_view(), name="ajax_employees_by_org"),
+    path("api/equipment/", views.EquipmentApiView.as_view(), name="equipment_api"),
 
     path("equipment-types/", views.EquipmentTypeListView.as_view(), name="equipmenttype_list"),
     path("equipment-types/create/", views.EquipmentTypeCreateView.as_view(), name="equipmenttype_create"),
@@ -1,47 +1,109 @@
 import csv
-import io
-from datetime import datetime
-from io import BytesIO
 from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
+from django.core.files.storage import default_storage
 from django.db import transaction
 from django.db.models import ProtectedError, Count, Q
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
-from django.utils.http import url_has_allowed_host_and_scheme
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag, url_has_allowed_host_and_scheme
 from django.views import View
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_POST
 from django.views.generic import DetailView, UpdateView, FormView, CreateView, DeleteView, ListView
 from django_filters.views import FilterView
 
-from apps.directory.models import Employee, Organization, Department
-from apps.inventory.filters import EquipmentFilter
+from apps.directory.models import Employee
+from apps.inventory.act_pdf import act_content_hash, act_template, ensure_act_pdf
+from apps.inventory.exporters import EQUIPMENT_CSV_HEADERS, EXPORT_FORMATS, iter_equipment_csv
+from apps.inventory.facets import apply_facet_labels, get_facets
+from apps.inventory.filters import AGE_CHOICES, EquipmentFilter
+from apps.inventory.import_jobs import enqueue_import_job
+from apps.inventory.import_validation import validate_rows
+from apps.inventory.importers import EquipmentImporter, open_csv
 from apps.inventory.form import (
     EquipmentForm, EquipmentMoveForm, EquipmentTypeForm, EquipmentCSVImportForm)
 from apps.inventory.models import (
     InventoryDocument, Equipment, EquipmentEventType,
-    EquipmentEvent, EquipmentType, EquipmentStatus, PrintMode)
+    EquipmentEvent, EquipmentType, EquipmentStatus, ImportJob, PdfJob, PdfJobStatus, PrintMode)
+from apps.inventory.pagination import InvalidCursor, KeysetPaginator, iter_keyset
+from apps.inventory.pdf_jobs import PdfJobMixin
+from apps.inventory.qr import QR_FORMATS, attach_qr_images, qr_digest, qr_image
+from apps.inventory.qr_archive import iter_qr_zip
+from apps.inventory.services import ApplyStatus, apply_document
+from apps.inventory.label_printing import (
+    LABEL_FORMATS, label_printer_configured, render_labels, send_to_printer)
 from django.conf import settings
-from config.pdf import render_pdf_response
+from config.counting import CachedCountMixin
+from config.widgets import remote_select_response
+from config.pdf import render_chunked_pdf, render_pdf_bytes, render_pdf_response
 
 from apps.directory.access import filter_queryset_by_user_orgs, user_has_org_access
+from apps.directory.normalize import normalize_search
 
 
-class EquipmentListView(LoginRequiredMixin, PermissionRequiredMixin, FilterView):
+class EquipmentListView(LoginRequiredMixin, PermissionRequiredMixin, CachedCountMixin, FilterView):
     permission_required = "inventory.view_equipment"
     template_name = "inventory/equipment_list.html"
     model = Equipment
     filterset_class = EquipmentFilter
     paginate_by = 10
+    # ?cursor=... включает keyset-режим: без OFFSET и без COUNT(*)
+    keyset_ordering = ("-created_at", "-id")
+
+    def use_keyset(self):
+        # при сортировке по сроку использования порядок не (created_at, id) — обычные страницы
+        return "cursor" in self.request.GET and not self.request.GET.get("sort")
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_keyset():
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(queryset, page_size, ordering=self.keyset_ordering)
+        try:
+            page = paginator.page(
+                self.request.GET.get("cursor") or None,
+                direction=self.request.GET.get("direction", "next"),
+            )
+        except InvalidCursor:
+            raise Http404("Неверный курсор страницы.")
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_filtered_queryset(self):
+        """
+        Отфильтрованный queryset для выгрузок — как в FilterView.get: без параметров
+        (форма не связана) — весь список, при ошибке в фильтре в strict-режиме — пусто.
+        """
+        self.object_list = self.get_queryset()
+        filt = self.get_filterset(self.filterset_class)
+        if not filt.is_bound or filt.is_valid() or not self.get_strict():
+            return filt.qs
+        return filt.queryset.none()
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         ctx["equipmenttype_meta"] = list(EquipmentType.objects.values("id", "category"))
+        ctx["keyset_mode"] = self.use_keyset()
+        if ctx["keyset_mode"]:
+            # COUNT(*) в keyset-режиме не выполняем; на больших выборках — оценка
+            ctx["approximate_count"] = self.get_approximate_count(self.object_list)
+        ctx["label_printer"] = label_printer_configured()
+
+        # счётчики рядом с вариантами статуса/типа/организации
+        facets = get_facets(self.object_list, self.get_filter_signature(self.object_list), self.filterset)
+        apply_facet_labels(self.filterset.form, facets)
+        ctx["facets"] = facets
         params = self.request.GET.copy()
         params.pop("page", None)
+        params.pop("cursor", None)
+        params.pop("direction", None)
 
         for key in list(params.keys()):
             values = [v for v in params.getlist(key) if str(v).strip()]
@@ -56,10 +118,72 @@ class EquipmentListView(LoginRequiredMixin, PermissionRequiredMixin, FilterView)
     def get_queryset(self):
         qs = Equipment.objects.select_related(
             "organization", "equipment_type", "assigned_to", "assigned_to__department"
-        ).order_by('-created_at')
+        ).with_usage_months().order_by(*self.keyset_ordering)
         return filter_queryset_by_user_orgs(qs, self.request.user, "organization")
 
 
+# поля, доступные в API (?fields=...): колонки и связанные поля через "__"; без specs
+EQUIPMENT_API_FIELDS = (
+    "id", "name", "model", "inventory_number", "serial_number", "status",
+    "commissioning_date", "created_at", "updated_at",
+    "cpu", "ram_gb", "storageHDD_gb", "storageSDD_gb", "print_format", "print_mode",
+    "organization_id", "organization__code", "organization__name",
+    "equipment_type_id", "equipment_type__name", "equipment_type__category",
+    "assigned_to_id", "assigned_to__full_name",
+)
+EQUIPMENT_API_DEFAULT_FIELDS = (
+    "id", "name", "inventory_number", "serial_number", "status", "organization_id", "equipment_type_id",
+)
+EQUIPMENT_API_MAX_LIMIT = 500
+
+
+@method_decorator(gzip_page, name="dispatch")
+class EquipmentApiView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """
+    JSON-список оборудования: фильтры EquipmentFilter, проекция values() только запрошенных
+    полей (?fields=id,name,organization__code), keyset-курсор (?cursor=, ?direction=prev).
+    """
+    permission_required = "inventory.view_equipment"
+    raise_exception = True
+    ordering = EquipmentListView.keyset_ordering
+
+    def get(self, request):
+        fields = [f.strip() for f in (request.GET.get("fields") or "").split(",") if f.strip()]
+        fields = fields or list(EQUIPMENT_API_DEFAULT_FIELDS)
+        unknown = [f for f in fields if f not in EQUIPMENT_API_FIELDS]
+        if unknown:
+            return JsonResponse({"error": f"Неизвестные поля: {', '.join(unknown)}"}, status=400)
+
+        try:
+            limit = min(max(int(request.GET.get("limit") or 50), 1), EQUIPMENT_API_MAX_LIMIT)
+        except ValueError:
+            return JsonResponse({"error": "limit должен быть числом"}, status=400)
+
+        base = filter_queryset_by_user_orgs(Equipment.objects.all(), request.user, "organization")
+        filt = EquipmentFilter(request.GET, queryset=base, request=request)
+        if not filt.is_valid():
+            return JsonResponse({"error": "Неверные параметры фильтра", "fields": filt.errors}, status=400)
+
+        # поля сортировки нужны для курсора, даже если их не запросили
+        keys = [name.lstrip("-") for name in self.ordering]
+        qs = filt.qs.values(*dict.fromkeys(fields + keys))
+
+        paginator = KeysetPaginator(qs, limit, ordering=self.ordering)
+        try:
+            page = paginator.page(
+                request.GET.get("cursor") or None,
+                direction=request.GET.get("direction", "next"),
+            )
+        except InvalidCursor:
+            return JsonResponse({"error": "Неверный курсор"}, status=400)
+
+        return JsonResponse({
+            "results": [{f: row[f] for f in fields} for row in page.object_list],
+            "next_cursor": page.next_cursor or None,
+            "previous_cursor": page.previous_cursor or None,
+        })
+
+
 class EquipmentUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
     permission_required = "inventory.change_equipment"
     model = Equipment
@@ -81,17 +205,6 @@ class EquipmentUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateVie
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         ctx["equipmenttype_meta"] = list(EquipmentType.objects.values("id", "category"))
-
-        # данные текущего сотрудника для TomSelect
-        emp = self.object.assigned_to
-        if emp:
-            ctx["initial_employee"] = {
-                "id": emp.id,
-                "name": emp.full_name,
-                "department": emp.department.name if emp.department else "",
-            }
-        else:
-            ctx["initial_employee"] = None
         return ctx
 
     def form_valid(self, form):
@@ -211,8 +324,10 @@ class EquipmentMoveView(LoginRequiredMixin, PermissionRequiredMixin, FormView):
         return redirect("inventory:equipment_detail", pk=eq.pk)
 
 
-class EquipmentListPdfView(EquipmentListView):
+class EquipmentListPdfView(PdfJobMixin, EquipmentListView):
     permission_required = "inventory.view_equipment"
+    pdf_job_kind = "equipment_list"
+    pdf_stylesheets = ("assets/css/pdf/equipment_list.css",)
 
     def _build_filter_summary(self, filt):
         data = getattr(filt.form, "cleaned_data", {}) or {}
@@ -232,6 +347,8 @@ class EquipmentListPdfView(EquipmentListView):
             parts.append(f"Дата ввода от: {data['commissioning_date__gte'].strftime('%d.%m.%Y')}")
         if data.get("commissioning_date__lte"):
             parts.append(f"Дата ввода до: {data['commissioning_date__lte'].strftime('%d.%m.%Y')}")
+        if data.get("age"):
+            parts.append(f"Срок использования: {dict(AGE_CHOICES).get(data['age'], data['age'])}")
         if data.get("cpu"):
             parts.append(f"CPU: {data['cpu']}")
         if data.get("ram_gb__gte"):
@@ -253,7 +370,7 @@ class EquipmentListPdfView(EquipmentListView):
 
         return "; ".join(parts) if parts else "нет"
 
-    def get(self, request, *args, **kwargs):
+    def get_pdf_document(self):
         self.object_list = self.get_queryset()
         filt = self.get_filterset(self.filterset_class)
 
@@ -261,10 +378,72 @@ class EquipmentListPdfView(EquipmentListView):
 
         context = {
             "filter": filt,
-            "request": request,
+            "objects": iter_keyset(filt.qs, ordering=self.keyset_ordering),
+            "request": self.request,
             "filter_summary": self._build_filter_summary(filt),
         }
-        return render_pdf_response(request, "inventory/equipment_list_pdf.html", context, "equipment.pdf")
+        return "inventory/equipment_list_pdf.html", context, "equipment.pdf"
+
+    def render_pdf_document(self, base_url=None):
+        template_name, context, filename = self.get_pdf_document()
+        threshold = getattr(settings, "PDF_PARALLEL_THRESHOLD", None)
+        if not threshold or context["filter"].qs.count() < threshold:
+            pdf = render_pdf_bytes(
+                template_name, context, request=self.request, base_url=base_url, stylesheets=self.pdf_stylesheets,
+            )
+            return pdf, filename
+
+        # большой список — по частям в пуле процессов, objects — тот же keyset-обход
+        objects = context.pop("objects")
+        pdf = render_chunked_pdf(
+            template_name, objects, context,
+            chunk_rows=getattr(settings, "PDF_CHUNK_ROWS", 500),
+            request=self.request,
+            base_url=base_url,
+            stylesheets=self.pdf_stylesheets,
+        )
+        return pdf, filename
+
+
+class EquipmentListExportView(EquipmentListView):
+    """
+    Выгрузка отфильтрованного списка в CSV (?format=csv, по умолчанию) или TSV.
+    Строки отдаются потоком, queryset читается порциями.
+    """
+    permission_required = "inventory.view_equipment"
+    chunk_size = 2000
+
+    def get(self, request, *args, **kwargs):
+        fmt = request.GET.get("format", "csv")
+        if fmt not in EXPORT_FORMATS:
+            fmt = "csv"
+        delimiter, content_type = EXPORT_FORMATS[fmt]
+
+        qs = self.get_filtered_queryset()
+        response = StreamingHttpResponse(
+            iter_equipment_csv(qs, delimiter=delimiter, chunk_size=self.chunk_size),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = f'attachment; filename="equipment.{fmt}"'
+        return response
+
+
+class EquipmentQrArchiveView(EquipmentListView):
+    """
+    ZIP с QR-кодами отфильтрованного списка (?format=png, по умолчанию, или svg),
+    файлы названы по инвентарным номерам. Архив отдаётся потоком.
+    """
+    permission_required = "inventory.view_equipment"
+
+    def get(self, request, *args, **kwargs):
+        fmt = request.GET.get("format", "png")
+        if fmt not in QR_FORMATS:
+            return HttpResponseBadRequest("Неизвестный формат QR.")
+
+        qs = self.get_filtered_queryset()
+        response = StreamingHttpResponse(iter_qr_zip(qs, fmt=fmt), content_type="application/zip")
+        response["Content-Disposition"] = f'attachment; filename="qr-{fmt}.zip"'
+        return response
 
 
 class EquipmentDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
@@ -277,7 +456,7 @@ class EquipmentDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailVie
             "organization", "equipment_type",
             "assigned_to", "assigned_to__department",
             "created_by", "updated_by",
-        ).prefetch_related(
+        ).with_usage_months().prefetch_related(
             "events",
             "events__from_employee",
             "events__to_employee",
@@ -312,13 +491,105 @@ class DocumentPdfView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
 
     def get(self, request, *args, **kwargs):
         doc = self.get_object()
-        if doc.doc_type == "transfer":
-            tpl = "inventory/pdf/act_transfer.html"
-            fname = f"act-transfer-{doc.number}.pdf"
-        else:
-            tpl = "inventory/pdf/act_writeoff.html"
-            fname = f"act-writeoff-{doc.number}.pdf"
-        return render_pdf_response(request, tpl, {"doc": doc}, fname)
+        tpl, fname = act_template(doc)
+        if not doc.applied_at:
+            # черновик ещё меняется — рендерим каждый раз
+            return render_pdf_response(request, tpl, {"doc": doc}, fname)
+
+        # применённый акт — из кэша в storage, с ETag/Last-Modified
+        digest = act_content_hash(doc, tpl)
+        etag = quote_etag(digest)
+        # файл нужен и для 304: If-Modified-Since сверяется с его временем
+        path = ensure_act_pdf(doc, tpl, digest, request=request)
+        last_modified = int(default_storage.get_modified_time(path).timestamp())
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            not_modified["ETag"] = etag
+            not_modified["Last-Modified"] = http_date(last_modified)
+            return not_modified
+
+        resp = FileResponse(default_storage.open(path, "rb"), content_type="application/pdf")
+        resp["Content-Disposition"] = f'inline; filename="{fname}"'
+        resp["ETag"] = etag
+        resp["Last-Modified"] = http_date(last_modified)
+        resp["Cache-Control"] = "private, no-cache"
+        return resp
+
+
+class PdfJobDetailView(LoginRequiredMixin, DetailView):
+    """
+    Страница ожидания фонового PDF: опрашивает статус и открывает файл, когда он готов.
+    """
+    template_name = "inventory/pdf_job.html"
+    context_object_name = "job"
+
+    def get_queryset(self):
+        return PdfJob.objects.filter(created_by=self.request.user)
+
+
+@login_required
+def pdf_job_status(request, pk):
+    job = get_object_or_404(PdfJob, pk=pk, created_by=request.user)
+    data = {
+        "status": job.status,
+        "status_display": job.get_status_display(),
+        "finished": job.is_finished,
+        "download_url": "",
+        "error": job.error,
+    }
+    if job.status == PdfJobStatus.DONE:
+        data["download_url"] = reverse("inventory:pdf_job_download", args=[job.pk])
+    return JsonResponse(data)
+
+
+@login_required
+def pdf_job_download(request, pk):
+    job = get_object_or_404(
+        PdfJob, pk=pk, created_by=request.user, status=PdfJobStatus.DONE, expires_at__gt=timezone.now()
+    )
+    if not job.file:
+        raise Http404("Файл не найден.")
+    return FileResponse(job.file.open("rb"), content_type="application/pdf", filename=job.filename)
+
+
+class ImportJobDetailView(LoginRequiredMixin, DetailView):
+    """
+    Прогресс фонового импорта CSV; по завершении — итоги и ошибки по строкам.
+    """
+    template_name = "inventory/import_job.html"
+    context_object_name = "job"
+    max_errors_shown = 500
+
+    def get_queryset(self):
+        return ImportJob.objects.filter(created_by=self.request.user)
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        errors = self.object.errors or []
+        ctx["import_errors"] = [
+            f"Строка {number}: {message}"
+            for number, message in sorted(errors, key=lambda e: e[0])[:self.max_errors_shown]
+        ]
+        ctx["error_count"] = self.object.error_count
+        return ctx
+
+
+@login_required
+def import_job_status(request, pk):
+    job = get_object_or_404(ImportJob, pk=pk, created_by=request.user)
+    return JsonResponse({
+        "status": job.status,
+        "status_display": job.get_status_display(),
+        "finished": job.is_finished,
+        "progress": job.progress,
+        "processed_row": job.processed_row,
+        "total_rows": job.total_rows,
+        "created": job.created_count,
+        "updated": job.updated_count,
+        "unchanged": job.unchanged_count,
+        "error_count": job.error_count,
+        "error": job.error,
+    })
 
 
 class EmployeesByOrganizationView(LoginRequiredMixin, View):
@@ -326,43 +597,35 @@ class EmployeesByOrganizationView(LoginRequiredMixin, View):
 
     def get(self, request):
         org_id = request.GET.get("organization_id")
-        if not org_id:
-            return JsonResponse({"results": []})
-
-        if not user_has_org_access(request.user, org_id):
-            return JsonResponse({"results": []})
+        if org_id and not user_has_org_access(request.user, org_id):
+            return JsonResponse({"results": [], "has_more": False})
 
-        # q = (request.GET.get("q") or "").strip()
         q = (request.GET.get("q") or "").strip()
         current_id = request.GET.get("current")  # ← текущий assigned_to
 
-        qs = (
-            Employee.objects.filter(
-                organization_id=org_id,
-                # active=True
-            )
-            .select_related("department")
-            .order_by("full_name")
-        )
+        # без организации — сотрудники всех доступных организаций (фильтр списка)
+        qs = Employee.objects.all()
+        if org_id:
+            qs = qs.filter(organization_id=org_id)
+        else:
+            qs = filter_queryset_by_user_orgs(qs, request.user, "organization")
 
         # Включаем текущего + всех активных
-        if current_id:
+        if current_id and current_id.isdigit():
             qs = qs.filter(Q(active=True) | Q(pk=current_id))
         else:
             qs = qs.filter(active=True)
 
         if q:
-            qs = qs.filter(full_name__icontains=q)
-
-        data = [
-            {
-                "id": e.id,
-                "name": e.full_name,
-                "department": (e.department.name if e.department else ""),
-            }
-            for e in qs[:200]
-        ]
-        return JsonResponse({"results": data})
+            # подстрока: ищут и по имени, и по части фамилии
+            qs = qs.filter(full_name_norm__contains=normalize_search(q))
+
+        qs = qs.select_related("department").order_by("full_name", "id")
+        return remote_select_response(request, qs, lambda e: {
+            "id": e.id,
+            "name": e.full_name,
+            "department": (e.department.name if e.department else ""),
+        })
 
 
 @login_required
@@ -377,13 +640,18 @@ def equipment_qr_png(request, pk: int):
         pk=pk,
     )
     # url = request.build_absolute_uri(reverse("inventory:equipment_detail", args=[equipment.pk]))
-    url = f"https://t.me/{settings.TELEGRAM_BOT_USERNAME}?start={equipment.qr_token}"
-    import qrcode
-    img = qrcode.make(url)
+    fmt = request.GET.get("format", "png")
+    if fmt not in QR_FORMATS:
+        return HttpResponseBadRequest("Неизвестный формат QR.")
 
-    buf = BytesIO()
-    img.save(buf, format="PNG")
-    return HttpResponse(buf.getvalue(), content_type="image/png")
+    # картинка не меняется, пока не сменились qr_token или имя бота — ETag по её содержимому
+    etag = quote_etag(f"{qr_digest(equipment.qr_token)}-{fmt}")
+    resp = get_conditional_response(request, etag=etag)
+    if resp is None:
+        resp = HttpResponse(qr_image(equipment.qr_token, fmt), content_type=QR_FORMATS[fmt])
+    resp["ETag"] = etag
+    resp["Cache-Control"] = f"private, max-age={getattr(settings, 'QR_CACHE_MAX_AGE', 86400)}"
+    return resp
 
 
 @login_required
@@ -400,6 +668,7 @@ def equipment_qr_label(request, pk: int):
     return render(request, "inventory/equipment_qr_label_58x40.html", {"object": equipment})
 
 
+@require_POST
 @login_required
 @permission_required("inventory.change_inventorydocument", raise_exception=True)
 def apply_document_view(request, pk: int):
@@ -411,7 +680,13 @@ def apply_document_view(request, pk: int):
         ),
         pk=pk,
     )
-    apply_document(doc)
+    status = apply_document(doc, user=request.user)
+    notify = {
+        ApplyStatus.APPLIED: messages.success,
+        ApplyStatus.ALREADY_APPLIED: messages.info,
+        ApplyStatus.EMPTY: messages.warning,
+    }[status]
+    notify(request, status.label)
     return redirect("inventory:document_detail", pk=pk)
 
 
@@ -494,366 +769,70 @@ class EquipmentImportCsvView(LoginRequiredMixin, PermissionRequiredMixin, FormVi
     form_class = EquipmentCSVImportForm
     success_url = reverse_lazy("inventory:equipment_list")
 
-    required_columns = {"organization_code", "equipment_type", "name"}
-
-    header_aliases = {
-        "organization_code": {
-            "organization_code",
-            "org_code",
-            "код_организации",
-            "Код организации",
-            "код",
-            "organization",
-            "организация",
-        },
-        "inventory_number": {
-            "inventory_number",
-            "инвентарный номер",
-            "инв_номер",
-            "инв. №",
-            "инв №",
-        },
-        "name": {
-            "name",
-            "наименование",
-            "название",
-        },
-        "assigned_to": {
-            "assigned_to",
-            "закреплено",
-            "сотрудник",
-            "ответственный",
-            "фио",
-        },
-        "department_name": {
-            "подразделение",
-            "отдел",
-            "department",
-            "department_name"
-        },
-        "equipment_type": {
-            "equipment_type",
-            "тип",
-            "тип оборудования",
-            "вид оборудования",
-        },
-        "serial_number": {
-            "serial_number",
-            "серийный номер",
-            "серийник",
-        },
-        "model": {
-            "model",
-            "модель",
-        },
-        "specs": {
-            "specs",
-            "характеристики",
-            "описание",
-        },
-        "cpu": {
-            "cpu",
-            "процессор",
-        },
-        "ram_gb": {
-            "ram_gb",
-            "озу",
-            "озу гб",
-            "ram",
-            "ram gb",
-        },
-        "storageHDD_gb": {
-            "storagehdd_gb",
-            "hdd",
-            "hdd гб",
-        },
-        "storageSDD_gb": {
-            "storagesdd_gb",
-            "sdd",
-            "ssd",
-            "ssd гб",
-            "sdd гб",
-        },
-        "print_format": {
-            "print_format",
-            "формат печати",
-        },
-        "print_mode": {
-            "print_mode",
-            "тип печати",
-            "печать",
-        },
-        "status": {
-            "status",
-            "статус",
-        },
-        "commissioning_date": {
-            "commissioning_date",
-            "дата поступления",
-            "дата ввода",
-        },
-    }
-
-    def _normalize_header(self, value):
-        return " ".join((value or "").strip().lower().replace("_", " ").split())
-
-    def _map_headers(self, fieldnames):
-        mapped = set()
-        for header in fieldnames:
-            normalized = self._normalize_header(header)
-            for canonical, aliases in self.header_aliases.items():
-                if normalized in {self._normalize_header(a) for a in aliases}:
-                    mapped.add(canonical)
-                    break
-        return mapped
-
-    def _map_row_keys(self, row):
-        mapped = {}
-        for raw_key, value in row.items():
-            if not raw_key:
-                continue
-
-            normalized = self._normalize_header(raw_key)
-            normalized = self._normalize_header(raw_key)
-            for canonical, aliases in self.header_aliases.items():
-                if normalized in {self._normalize_header(a) for a in aliases}:
-                    mapped[canonical] = (value or "").strip()
-                    break
-            # canonical = None
-            # for field_name, aliases in self.header_aliases.items():
-            #     normalized_aliases = {self._normalize_header(a) for a in aliases}
-            #     if normalized in normalized_aliases:
-            #         canonical = field_name
-            #         break
-            #
-            # if canonical:
-            #     mapped[canonical] = (value or "").strip()
-
-        return mapped
-
-    def _parse_int(self, value):
-        value = (value or "").strip()
-        if not value:
-            return None
-        return int(value)
-
-    def _parse_date(self, value):
-        value = (value or "").strip()
-        if not value:
-            return None
-
-        for fmt in ("%Y-%m-%d", "%d.%m.%Y", "%d/%m/%Y"):
-            try:
-                return datetime.strptime(value, fmt).date()
-            except ValueError:
-                continue
-
-        raise ValueError(f"Неверная дата: {value}")
-
-    def _build_choice_map(self, choices):
-        result = {}
-        for code, label in choices:
-            result[self._normalize_header(code)] = code
-            result[self._normalize_header(label)] = code
-        return result
-
-    def _get_or_create_department(self, organization, department_name):
-        if not department_name:
-            return None
-
-        department = Department.objects.filter(
-            organization=organization,
-            name__iexact=department_name,
-        ).first()
-
-        if department:
-            if not department.active:
-                department.active = True
-                department.save(update_fields=["active"])
-            return department
-
-        return Department.objects.create(
-            organization=organization,
-            name=department_name,
-            active=True,
-        )
-
-    def _get_or_create_employee(self, organization, employee_name, department=None):
-        if not employee_name:
-            return None
-
-        employee = Employee.objects.filter(
-            organization=organization,
-            full_name__iexact=employee_name,
-        ).first()
-
-        if employee:
-            update_fields = []
-
-            if not employee.active:
-                employee.active = True
-                update_fields.append("active")
-
-            if department and employee.department_id != department.id:
-                employee.department = department
-                update_fields.append("department")
-
-            if update_fields:
-                employee.save(update_fields=update_fields)
-
-            return employee
-
-        return Employee.objects.create(
-            organization=organization,
-            full_name=employee_name,
-            department=department,
-            active=True,
-        )
-
     def form_valid(self, form):
         upload = form.cleaned_data["csv_file"]
         update_existing = form.cleaned_data.get("update_existing", False)
         delimiter = form.cleaned_data.get("delimiter", ";")
+        dry_run = form.cleaned_data.get("dry_run", False)
 
-        raw_bytes = upload.read()
+        importer = EquipmentImporter(self.request.user, update_existing=update_existing)
+        run_async = getattr(settings, "IMPORT_ASYNC", False) and not dry_run
         try:
-            raw = raw_bytes.decode("utf-8-sig")
+            with open_csv(upload, delimiter) as reader:
+                if not reader.fieldnames:
+                    form.add_error("csv_file", "CSV файл пустой или не содержит заголовков.")
+                    return self.form_invalid(form)
+
+                missing = importer.missing_columns(reader.fieldnames)
+                if missing:
+                    form.add_error("csv_file", "Отсутствуют обязательные колонки: " + ", ".join(missing))
+                    return self.form_invalid(form)
+
+                if dry_run:
+                    result = validate_rows(importer, reader)
+                elif not run_async:
+                    result = importer.run(reader)
         except UnicodeDecodeError:
-            raw = raw_bytes.decode("cp1251")
-
-        reader = csv.DictReader(io.StringIO(raw), delimiter=delimiter)
-
-        if not reader.fieldnames:
-            form.add_error("csv_file", "CSV файл пустой или не содержит заголовков.")
-            return self.form_invalid(form)
-
-        normalized_headers = set()
-
-        for h in reader.fieldnames:
-            if h:
-                mapped_name = self._map_row_keys({h: ""}).keys()
-                normalized_headers.update(mapped_name)
-
-        missing = self.required_columns - normalized_headers
-        if missing:
-            human_names = {
-                "organization_code": "Код организации",
-                "equipment_type": "Тип",
-                "name": "Наименование",
-            }
             form.add_error(
                 "csv_file",
-                "Отсутствуют обязательные колонки: " + ", ".join(human_names[x] for x in sorted(missing))
+                "Файл не в кодировке UTF-8 / Windows-1251 или кодировки смешаны; ничего не импортировано.",
             )
             return self.form_invalid(form)
 
-        status_map = self._build_choice_map(EquipmentStatus.choices)
-        print_mode_map = self._build_choice_map(PrintMode.choices)
-
-        created_count = 0
-        updated_count = 0
-        errors = []
-
-        for row_number, row in enumerate(reader, start=2):
-            try:
-                row = self._map_row_keys(row)
-
-                if not any(row.values()):
-                    continue
-
-                org_code = row.get("organization_code", "")
-                type_name = row.get("equipment_type", "")
-                name = row.get("name", "")
-                department_name = row.get("department_name", "")
-                employee_name = row.get("assigned_to", "")
-
-                if not org_code or not type_name or not name:
-                    raise ValueError("Обязательные поля: Код организации, Тип, Наименование")
-
-                organization = Organization.objects.filter(code__iexact=org_code).first()
-                if not organization:
-                    raise ValueError(f"Организация не найдена по коду: {org_code}")
-
-                if not user_has_org_access(self.request.user, organization.id):
-                    raise ValueError(f"Нет доступа к организации: {org_code}")
-
-                equipment_type = EquipmentType.objects.filter(name__iexact=type_name).first()
-                if not equipment_type:
-                    raise ValueError(f"Тип оборудования не найден: {type_name}")
-
-                with transaction.atomic():
-                    department = self._get_or_create_department(organization, department_name)
-                    assigned_to = self._get_or_create_employee(
-                        organization=organization,
-                        employee_name=employee_name,
-                        department=department,
-                    )
-
-                    inventory_number = row.get("inventory_number", "")
-                    equipment = None
-                    action = "create"
-                    if update_existing and inventory_number:
-                        equipment = Equipment.objects.filter(
-                            organization=organization,
-                            inventory_number=inventory_number,
-                        ).first()
-
-                    if equipment:
-                        action = "update"
-                    else:
-                        equipment = Equipment(organization=organization)
-
-                    status_value = row.get("status", "")
-                    if status_value:
-                        status_value = status_map.get(self._normalize_header(status_value))
-                        if not status_value:
-                            raise ValueError(f"Неизвестный статус: {row.get('status')}")
-                    else:
-                        status_value = EquipmentStatus.IN_USE
-
-                    print_mode_value = row.get("print_mode", "")
-                    if print_mode_value:
-                        print_mode_value = print_mode_map.get(self._normalize_header(print_mode_value))
-                        if not print_mode_value:
-                            raise ValueError(f"Неизвестный тип печати: {row.get('print_mode')}")
-                    else:
-                        print_mode_value = ""
-
-                    equipment.organization = organization
-                    equipment.equipment_type = equipment_type
-                    equipment.name = name
-                    equipment.inventory_number = inventory_number
-                    equipment.serial_number = row.get("serial_number", "")
-                    equipment.model = row.get("model", "")
-                    equipment.specs = row.get("specs", "")
-                    equipment.commissioning_date = self._parse_date(row.get("commissioning_date", ""))
-                    equipment.status = status_value
-                    equipment.assigned_to = assigned_to
-                    equipment.cpu = row.get("cpu", "")
-                    equipment.ram_gb = self._parse_int(row.get("ram_gb", ""))
-                    equipment.storageHDD_gb = self._parse_int(row.get("storageHDD_gb", ""))
-                    equipment.storageSDD_gb = self._parse_int(row.get("storageSDD_gb", ""))
-                    equipment.print_format = row.get("print_format", "")
-                    equipment.print_mode = print_mode_value
-
-                    if action == "create":
-                        equipment.created_by = self.request.user
-                    equipment.updated_by = self.request.user
-
-                    equipment.save()
-
-                    if action == "create":
-                        created_count += 1
-                    else:
-                        updated_count += 1
-
-            except Exception as e:
-                errors.append(f"Строка {row_number}: {e}")
+        if run_async:
+            # большой файл не держит запрос: импорт в Celery, здесь — страница прогресса
+            upload.seek(0)
+            job = enqueue_import_job(self.request, upload, update_existing=update_existing, delimiter=delimiter)
+            return redirect("inventory:import_job_detail", pk=job.pk)
+
+        created_count, updated_count, errors = result.created, result.updated, result.errors
+        unchanged_count = result.unchanged
+
+        if dry_run:
+            summary = (
+                f"Будет создано: {created_count}, обновлено: {updated_count}, без изменений: {unchanged_count}. "
+                "Данные не записаны."
+            )
+            if errors:
+                messages.warning(self.request, f"Проверка: ошибок {len(errors)}. {summary}")
+            else:
+                messages.success(self.request, f"Проверка: ошибок нет. {summary}")
+            return self.render_to_response(
+                self.get_context_data(
+                    form=form,
+                    import_errors=errors,
+                    created_count=created_count,
+                    updated_count=updated_count,
+                    unchanged_count=unchanged_count,
+                    dry_run=True,
+                )
+            )
 
         if errors:
             messages.warning(
                 self.request,
-                f"Импорт завершён с ошибками. Создано: {created_count}, обновлено: {updated_count}, ошибок: {len(errors)}"
+                f"Импорт завершён с ошибками. Создано: {created_count}, обновлено: {updated_count}, "
+                f"без изменений: {unchanged_count}, ошибок: {len(errors)}"
             )
             return self.render_to_response(
                 self.get_context_data(
@@ -861,114 +840,17 @@ class EquipmentImportCsvView(LoginRequiredMixin, PermissionRequiredMixin, FormVi
                     import_errors=errors,
                     created_count=created_count,
                     updated_count=updated_count,
+                    unchanged_count=unchanged_count,
                 )
             )
 
         messages.success(
             self.request,
-            f"Импорт выполнен успешно. Создано: {created_count}, обновлено: {updated_count}"
+            f"Импорт выполнен успешно. Создано: {created_count}, обновлено: {updated_count}, "
+            f"без изменений: {unchanged_count}"
         )
         return super().form_valid(form)
 
-        #
-        #         assigned_to = None
-        #         assigned_name = row.get("assigned_to", "")
-        #         if assigned_name:
-        #             assigned_to = Employee.objects.filter(
-        #                 organization=organization,
-        #                 full_name__iexact=assigned_name,
-        #                 active=True,
-        #             ).first()
-        #             if not assigned_to:
-        #                 raise ValueError(f"Сотрудник не найден: {assigned_name}")
-        #
-        #         inventory_number = row.get("inventory_number", "")
-        #         serial_number = row.get("serial_number", "")
-        #
-        #         equipment = None
-        #         action = "create"
-        #
-        #         if update_existing:
-        #             if inventory_number:
-        #                 equipment = Equipment.objects.filter(
-        #                     organization=organization,
-        #                     inventory_number=inventory_number
-        #                 ).first()
-        #             elif serial_number:
-        #                 equipment = Equipment.objects.filter(
-        #                     organization=organization,
-        #                     serial_number=serial_number
-        #                 ).first()
-        #
-        #             if equipment:
-        #                 action = "update"
-        #
-        #         if not equipment:
-        #             equipment = Equipment(organization=organization)
-        #
-        #         status_value = row.get("status", "")
-        #         if status_value:
-        #             status_value = status_map.get(self._normalize_header(status_value))
-        #             if not status_value:
-        #                 raise ValueError(f"Неизвестный статус: {row.get('status')}")
-        #         else:
-        #             status_value = EquipmentStatus.IN_USE
-        #
-        #         print_mode_value = row.get("print_mode", "")
-        #         if print_mode_value:
-        #             print_mode_value = print_mode_map.get(self._normalize_header(print_mode_value))
-        #             if not print_mode_value:
-        #                 raise ValueError(f"Неизвестный тип печати: {row.get('print_mode')}")
-        #         else:
-        #             print_mode_value = ""
-        #
-        #         equipment.organization = organization
-        #         equipment.equipment_type = equipment_type
-        #         equipment.name = name
-        #         equipment.inventory_number = inventory_number
-        #         equipment.serial_number = row.get("serial_number", "")
-        #         equipment.model = row.get("model", "")
-        #         equipment.specs = row.get("specs", "")
-        #         equipment.commissioning_date = self._parse_date(row.get("commissioning_date", ""))
-        #         equipment.status = status_value
-        #         equipment.assigned_to = assigned_to
-        #         equipment.cpu = row.get("cpu", "")
-        #         equipment.ram_gb = self._parse_int(row.get("ram_gb", ""))
-        #         equipment.storageHDD_gb = self._parse_int(row.get("storageHDD_gb", ""))
-        #         equipment.storageSDD_gb = self._parse_int(row.get("storageSDD_gb", ""))
-        #         equipment.print_format = row.get("print_format", "")
-        #         equipment.print_mode = print_mode_value
-        #
-        #         equipment.save()
-        #
-        #         if action == "create":
-        #             created_count += 1
-        #         else:
-        #             updated_count += 1
-        #
-        #     except Exception as e:
-        #         errors.append(f"Строка {row_number}: {e}")
-        #
-        # if errors:
-        #     messages.warning(
-        #         self.request,
-        #         f"Импорт завершён с ошибками. Создано: {created_count}, обновлено: {updated_count}, ошибок: {len(errors)}"
-        #     )
-        #     return self.render_to_response(
-        #         self.get_context_data(
-        #             form=form,
-        #             import_errors=errors,
-        #             created_count=created_count,
-        #             updated_count=updated_count,
-        #         )
-        #     )
-        #
-        # messages.success(
-        #     self.request,
-        #     f"Импорт выполнен успешно. Создано: {created_count}, обновлено: {updated_count}"
-        # )
-        # return super().form_valid(form)
-
 
 @login_required
 @permission_required("inventory.add_equipment", raise_exception=True)
@@ -978,25 +860,7 @@ def equipment_csv_template(request):
     response.write("\ufeff")
 
     writer = csv.writer(response, delimiter=";")
-    writer.writerow([
-        "Код организации",
-        "Инвентарный номер",
-        "Наименование",
-        "Сотрудник",
-        "Подразделение",
-        "Тип",
-        "Серийный номер",
-        "Модель",
-        "Характеристики",
-        "Процессор",
-        "ОЗУ",
-        "HDD",
-        "SSD",
-        "Формат печати",
-        "Тип печати",
-        "Статус",
-        "Дата поступления",
-    ])
+    writer.writerow(EQUIPMENT_CSV_HEADERS)
     writer.writerow([
         "400",
         "INV-001",
@@ -1019,10 +883,8 @@ def equipment_csv_template(request):
     ])
     return response
 
-@login_required
-@permission_required("inventory.view_equipment", raise_exception=True)
-def equipment_qr_labels_selected(request):
-    raw_ids = request.GET.getlist("ids")
+def _selected_equipment(user, raw_ids):
+    """Выбранное оборудование в порядке ids, только из организаций пользователя."""
     ids = []
 
     for value in raw_ids:
@@ -1032,24 +894,99 @@ def equipment_qr_labels_selected(request):
             continue
 
     if not ids:
-        return HttpResponseBadRequest("Не выбрано ни одного оборудования.")
+        return []
 
     qs = filter_queryset_by_user_orgs(
         Equipment.objects.select_related(
             "organization", "equipment_type", "assigned_to", "assigned_to__department"
         ),
-        request.user,
+        user,
         "organization",
     ).filter(pk__in=ids)
 
     by_id = {obj.pk: obj for obj in qs}
-    objects = [by_id[pk] for pk in ids if pk in by_id]
+    return [by_id[pk] for pk in ids if pk in by_id]
+
+
+@login_required
+@permission_required("inventory.view_equipment", raise_exception=True)
+def equipment_qr_labels_selected(request):
+    if not request.GET.getlist("ids"):
+        return HttpResponseBadRequest("Не выбрано ни одного оборудования.")
 
+    objects = _selected_equipment(request.user, request.GET.getlist("ids"))
     if not objects:
         return HttpResponseBadRequest("Нет доступного оборудования для печати.")
 
-    return render(
-        request,
-        "inventory/equipment_qr_labels_selected_58x40.html",
-        {"objects": objects},
-    )
+    fmt = request.GET.get("format")
+    if fmt in LABEL_FORMATS:
+        # команды термопринтера файлом (ZPL / ESC/POS)
+        _, ext = LABEL_FORMATS[fmt]
+        resp = HttpResponse(render_labels(objects, fmt), content_type="application/octet-stream")
+        resp["Content-Disposition"] = f'attachment; filename="labels-58x40.{ext}"'
+        return resp
+
+    if fmt == "pdf":
+        return EquipmentLabelsPdfView.as_view(objects=objects)(request)
+
+    # QR встраиваются в страницу data URI — вся партия одним ответом
+    attach_qr_images(objects)
+    return render(request, "inventory/equipment_qr_labels_selected_58x40.html", {"objects": objects})
+
+
+class EquipmentLabelsPdfView(PdfJobMixin, View):
+    """
+    PDF этикеток 58x40 по ids из GET. Большая выборка (от PDF_LABELS_ASYNC_FROM)
+    рендерится в Celery: ids едут в params задания, доступ — по его пользователю.
+    """
+    pdf_job_kind = "equipment_labels"
+    # выборка, уже загруженная в equipment_qr_labels_selected; в воркере — None
+    objects = None
+
+    def use_pdf_job(self):
+        threshold = getattr(settings, "PDF_LABELS_ASYNC_FROM", 200)
+        return super().use_pdf_job() and len(self.request.GET.getlist("ids")) >= threshold
+
+    def get_pdf_document(self):
+        objects = self.objects
+        if objects is None:
+            objects = _selected_equipment(self.request.user, self.request.GET.getlist("ids"))
+        attach_qr_images(objects)
+        context = {"objects": objects, "is_pdf": True}
+        return "inventory/equipment_qr_labels_selected_58x40.html", context, "labels-58x40.pdf"
+
+
+@require_POST
+@login_required
+@permission_required("inventory.view_equipment", raise_exception=True)
+def equipment_labels_print(request):
+    """
+    POST ids=...: этикетки сразу на сетевой термопринтер (settings.LABEL_PRINTER_*).
+    """
+    next_url = request.POST.get("next") or ""
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        next_url = reverse("inventory:equipment_list")
+
+    if not label_printer_configured():
+        messages.error(request, "Принтер этикеток не настроен.")
+        return redirect(next_url)
+
+    objects = _selected_equipment(request.user, request.POST.getlist("ids"))
+    if not objects:
+        messages.error(request, "Нет доступного оборудования для печати.")
+        return redirect(next_url)
+
+    fmt = getattr(settings, "LABEL_PRINTER_PROTOCOL", "zpl")
+    if fmt not in LABEL_FORMATS:
+        messages.error(
+            request, f"Неизвестный протокол принтера этикеток: {fmt}. Допустимо: {', '.join(LABEL_FORMATS)}."
+        )
+        return redirect(next_url)
+
+    try:
+        send_to_printer(render_labels(objects, fmt))
+    except OSError as exc:
+        messages.error(request, f"Не удалось отправить этикетки на принтер: {exc}")
+    else:
+        messages.success(request, f"Отправлено на принтер этикеток: {len(objects)}.")
+    return redirect(next_url)
@@ -0,0 +1,144 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from apps.directory.access import org_scope_key
+
+# GET-параметры, которые не влияют на количество строк
+NON_FILTER_PARAMS = {"page", "cursor", "direction", "sort"}
+
+
+def _version_key(model):
+    return f"list-count-version:{model._meta.label_lower}"
+
+
+def get_count_version(model):
+    return cache.get_or_set(_version_key(model), 1, timeout=None)
+
+
+def bump_count_version(model):
+    """
+    Инвалидирует все закэшированные количества для списков, зависящих от model.
+    Вызывается из сигналов и вручную после bulk_create/bulk_update/update().
+    """
+    key = _version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+
+
+def normalize_params(querydict):
+    items = []
+    for key in sorted(querydict.keys()):
+        if key in NON_FILTER_PARAMS:
+            continue
+        values = sorted(v.strip() for v in querydict.getlist(key) if str(v).strip())
+        if values:
+            items.append((key, values))
+    return json.dumps(items, ensure_ascii=False)
+
+
+def estimate_count(queryset):
+    """
+    Оценка количества строк по плану запроса (только PostgreSQL).
+    Для других СУБД возвращает None — будет выполнен точный COUNT.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator, который берёт count из кэша по cache_key. count всегда точный:
+    от него зависят num_pages и проверка номера страницы. Оценка планировщика
+    для показа — CachedCountMixin.get_approximate_count().
+    """
+
+    def __init__(self, *args, cache_key=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_key = cache_key
+
+    @cached_property
+    def count(self):
+        if not self.cache_key:
+            return super().count
+
+        value = cache.get(self.cache_key)
+        if value is None:
+            value = super().count
+            cache.set(self.cache_key, value, getattr(settings, "LIST_COUNT_CACHE_TIMEOUT", 300))
+        return value
+
+
+class CachedCountMixin:
+    """
+    Для ListView/FilterView: количество найденных строк кэшируется по
+    (модели и их версии, область организаций пользователя, параметры фильтра).
+    count_models — модели, изменение которых меняет результат (по умолчанию model списка).
+    """
+    paginator_class = CachedCountPaginator
+    count_models = None
+
+    def get_count_models(self, queryset):
+        return self.count_models or (queryset.model,)
+
+    def get_filter_signature(self, queryset):
+        """
+        Хэш (версии моделей, область организаций, параметры фильтра) —
+        общая часть ключей кэша для количества и фасетов.
+        """
+        versions = ",".join(
+            f"{m._meta.label_lower}:{get_count_version(m)}" for m in self.get_count_models(queryset)
+        )
+        raw = "|".join([
+            versions,
+            org_scope_key(self.request.user),
+            normalize_params(self.request.GET),
+        ])
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get_count_cache_key(self, queryset):
+        return "list-count:" + self.get_filter_signature(queryset)
+
+    def get_approximate_count(self, queryset):
+        """
+        Число строк для показа там, где точный COUNT не нужен (keyset-режим):
+        оценка планировщика, если она не меньше LIST_COUNT_ESTIMATE_THRESHOLD,
+        иначе None — тогда число не показывается.
+        """
+        threshold = getattr(settings, "LIST_COUNT_ESTIMATE_THRESHOLD", None)
+        if not threshold:
+            return None
+        key = "list-count-estimate:" + self.get_filter_signature(queryset)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached or None
+        estimate = estimate_count(queryset)
+        value = estimate if estimate is not None and estimate >= threshold else 0
+        cache.set(key, value, getattr(settings, "LIST_COUNT_CACHE_TIMEOUT", 300))
+        return value or None
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        return self.paginator_class(
+            queryset,
+            per_page,
+            orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page,
+            cache_key=self.get_count_cache_key(queryset),
+            **kwargs,
+        )
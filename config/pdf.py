@@ -1,18 +1,259 @@
+import io
+import mimetypes
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
 from django.http import HttpResponse
 from django.template.loader import render_to_string
+from django.utils._os import safe_join
+from django.utils.html import escape
 
-def render_pdf_response(request, template_name: str, context: dict, filename: str):
+# base_url для PDF: относительные /static/... и /media/... разрешаются от него
+# и читаются url_fetcher'ом с диска, без HTTP-запроса к самому себе
+PDF_BASE_URL = "http://pdf.local/"
+
+
+class PdfRenderer:
     """
-    WeasyPrint: HTML(template) -> PDF response
+    Долгоживущий рендерер WeasyPrint: один FontConfiguration и однажды разобранные
+    CSS (settings.PDF_STYLESHEETS и стили, переданные в render) на всё время жизни
+    процесса/потока. Статика и MEDIA отдаются url_fetcher'ом из файловой системы.
+    """
+
+    def __init__(self, stylesheets=None):
+        if stylesheets is None:
+            stylesheets = getattr(settings, "PDF_STYLESHEETS", ())
+        self.default_stylesheets = tuple(stylesheets)
+        self.local_hosts = {urlsplit(PDF_BASE_URL).netloc}
+        self._font_config = None
+        self._css = {}
+
+    @property
+    def font_config(self):
+        if self._font_config is None:
+            from weasyprint.text.fonts import FontConfiguration
+
+            self._font_config = FontConfiguration()
+        return self._font_config
+
+    def stylesheet(self, path):
+        """CSS по пути в статике, разобранный один раз."""
+        css = self._css.get(path)
+        if css is None:
+            from weasyprint import CSS
+
+            filename = _static_file(path)
+            if filename is None:
+                raise FileNotFoundError(f"PDF stylesheet not found: {path}")
+            css = CSS(filename=filename, font_config=self.font_config, url_fetcher=self.url_fetcher)
+            self._css[path] = css
+        return css
+
+    def url_fetcher(self, url, **kwargs):
+        local = self._local_file(url)
+        if local is not None:
+            with open(local, "rb") as fh:
+                data = fh.read()
+            mime_type, encoding = mimetypes.guess_type(local)
+            return {
+                "string": data,
+                "mime_type": mime_type or "application/octet-stream",
+                "encoding": encoding,
+                "redirected_url": url,
+            }
+
+        from weasyprint import default_url_fetcher
+
+        return default_url_fetcher(url, **kwargs)
+
+    def _local_file(self, url):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or parts.netloc not in self.local_hosts:
+            return None
+        path = unquote(parts.path)
+        if path.startswith(settings.STATIC_URL):
+            return _static_file(path[len(settings.STATIC_URL):])
+        if settings.MEDIA_URL and path.startswith(settings.MEDIA_URL):
+            return _safe_file(settings.MEDIA_ROOT, path[len(settings.MEDIA_URL):])
+        return None
+
+    def render(self, html, base_url=None, stylesheets=()):
+        """HTML-строка -> байты PDF."""
+        from weasyprint import HTML
+
+        if base_url:
+            # старые задания/ссылки с адресом сайта — тоже читаем локально
+            self.local_hosts.add(urlsplit(base_url).netloc)
+        css = [self.stylesheet(path) for path in (*self.default_stylesheets, *stylesheets)]
+        document = HTML(string=html, base_url=base_url or PDF_BASE_URL, url_fetcher=self.url_fetcher)
+        return document.write_pdf(stylesheets=css, font_config=self.font_config)
+
+
+def _safe_file(root, relative):
+    if not root:
+        return None
+    try:
+        path = safe_join(root, relative)
+    except SuspiciousFileOperation:
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def _static_file(relative):
+    """Файл статики: сначала STATIC_ROOT (collectstatic), затем finders (dev)."""
+    path = _safe_file(settings.STATIC_ROOT, relative)
+    if path is None:
+        from django.contrib.staticfiles import finders
+
+        try:
+            path = finders.find(relative)
+        except SuspiciousFileOperation:
+            return None
+    return path
+
+
+_local = threading.local()
+
+
+def get_pdf_renderer():
+    """
+    Рендерер текущего потока (FontConfiguration не разделяем между потоками).
+    Один и тот же и для view, и для Celery-воркера, и для процессов пула.
     """
-    from weasyprint import HTML
+    renderer = getattr(_local, "renderer", None)
+    if renderer is None:
+        renderer = _local.renderer = PdfRenderer()
+    return renderer
+
 
+def render_pdf_bytes(template_name: str, context: dict, request=None, base_url=None, stylesheets=()) -> bytes:
+    """
+    WeasyPrint: HTML(template) -> байты PDF. Используется и в запросе, и в Celery-задаче
+    (там request собирается из PdfJob). stylesheets — пути CSS в статике.
+    """
     html = render_to_string(template_name, context=context, request=request)
+    return get_pdf_renderer().render(html, base_url=base_url, stylesheets=stylesheets)
 
-    # base_url нужен для статики/картинок (если будете добавлять логотипы)
-    base_url = request.build_absolute_uri("/")
-    pdf_bytes = HTML(string=html, base_url=base_url).write_pdf()
+
+def render_pdf_response(request, template_name: str, context: dict, filename: str):
+    """
+    WeasyPrint: HTML(template) -> PDF response
+    """
+    pdf_bytes = render_pdf_bytes(template_name, context, request=request)
 
     resp = HttpResponse(pdf_bytes, content_type="application/pdf")
     resp["Content-Disposition"] = f'inline; filename="{filename}"'
-    return resp
\ No newline at end of file
+    return resp
+
+
+def _html_to_pdf(html, base_url=None, stylesheets=()):
+    # выполняется в процессе пула: только WeasyPrint, без обращения к БД;
+    # рендерер живёт в процессе и переиспользуется для следующих порций
+    return get_pdf_renderer().render(html, base_url=base_url, stylesheets=stylesheets)
+
+
+def _pool_workers():
+    workers = getattr(settings, "PDF_WORKERS", None) or os.cpu_count() or 1
+    # дочерние процессы Celery (prefork) — демоны, им нельзя создавать свой пул
+    if multiprocessing.current_process().daemon:
+        return 1
+    return workers
+
+
+def render_chunked_pdf(template_name, rows, context, chunk_rows=500, request=None, base_url=None, stylesheets=()):
+    """
+    Большой список в PDF по частям: строки rows режутся на порции по chunk_rows,
+    HTML каждой порции рендерится здесь, а вёрстка WeasyPrint идёт в пуле процессов.
+    Части склеиваются pypdf, сквозные номера страниц ставятся отдельным проходом.
+
+    В шаблон приходят context + objects (строки порции), is_first_chunk, chunked=True.
+    """
+    def htmls():
+        chunk = []
+        first = True
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield render_to_string(
+                    template_name,
+                    {**context, "objects": chunk, "is_first_chunk": first, "chunked": True},
+                    request=request,
+                )
+                chunk, first = [], False
+        if chunk or first:
+            yield render_to_string(
+                template_name,
+                {**context, "objects": chunk, "is_first_chunk": first, "chunked": True},
+                request=request,
+            )
+
+    workers = _pool_workers()
+    if workers <= 1:
+        parts = [_html_to_pdf(html, base_url, stylesheets) for html in htmls()]
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            # не держим в памяти больше нескольких порций HTML на процесс
+            futures, parts = [], []
+            for html in htmls():
+                futures.append(pool.submit(_html_to_pdf, html, base_url, stylesheets))
+                if len(futures) >= workers * 2:
+                    parts.append(futures.pop(0).result())
+            parts.extend(f.result() for f in futures)
+
+    return stamp_page_numbers(merge_pdfs(parts))
+
+
+def merge_pdfs(parts):
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(io.BytesIO(part))
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def stamp_page_numbers(pdf_bytes, template="Стр. {page} из {pages}"):
+    """
+    Накладывает "Стр. N из M" в правый нижний угол каждой страницы склеенного PDF.
+    Штамп рендерит WeasyPrint (те же шрифты), по странице на каждую страницу документа.
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    total = len(reader.pages)
+    if not total:
+        return pdf_bytes
+
+    box = reader.pages[0].mediabox
+    width_mm = float(box.width) * 25.4 / 72
+    # чуть меньше страницы, чтобы блок гарантированно не переносился на следующую
+    height_mm = float(box.height) * 25.4 / 72
+    pages_html = "".join(
+        f'<div class="n">{escape(template.format(page=i + 1, pages=total))}</div>' for i in range(total)
+    )
+    stamp_html = (
+        "<html><head><style>"
+        f"@page {{ size: {width_mm:.1f}mm {height_mm:.1f}mm; margin: 0; }}"
+        "body { margin: 0; font-family: DejaVu Sans, sans-serif; font-size: 7px; color: #444; }"
+        f".n {{ height: {height_mm - 0.5:.1f}mm; box-sizing: border-box; padding: 0 8mm 3mm 0;"
+        " display: flex; align-items: flex-end; justify-content: flex-end; page-break-after: always; }"
+        ".n:last-child { page-break-after: auto; }"
+        "</style></head><body>" + pages_html + "</body></html>"
+    )
+    stamps = PdfReader(io.BytesIO(get_pdf_renderer().render(stamp_html)))
+
+    writer = PdfWriter()
+    for page, stamp in zip(reader.pages, stamps.pages):
+        page.merge_page(stamp)
+        writer.add_page(page)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
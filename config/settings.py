@@ -113,6 +113,28 @@ DATABASES = {
 #     }
 # }
 
+# Cache
+# Redis, если задан CACHE_URL (например redis://redis:6379/1), иначе — память процесса
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Счётчики "Найдено" в списках: время жизни кэша и порог, начиная с которого
+# в keyset-режиме (без COUNT) показывается оценка планировщика (PostgreSQL)
+LIST_COUNT_CACHE_TIMEOUT = config('LIST_COUNT_CACHE_TIMEOUT', default=300, cast=int)
+LIST_COUNT_ESTIMATE_THRESHOLD = config('LIST_COUNT_ESTIMATE_THRESHOLD', default=50000, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -175,4 +197,82 @@ CELERY_RESULT_BACKEND = 'redis://redis:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
-CELERY_TIMEZONE = TIME_ZONE
\ No newline at end of file
+CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    "cleanup-pdf-jobs": {
+        "task": "apps.inventory.tasks.cleanup_pdf_jobs",
+        "schedule": 60 * 60,
+    },
+    "resume-pdf-jobs": {
+        "task": "apps.inventory.tasks.resume_pdf_jobs",
+        "schedule": 5 * 60,
+    },
+    "resume-import-jobs": {
+        "task": "apps.inventory.tasks.resume_import_jobs",
+        "schedule": 5 * 60,
+    },
+    "cleanup-import-jobs": {
+        "task": "apps.inventory.tasks.cleanup_import_jobs",
+        "schedule": 24 * 60 * 60,
+    },
+}
+
+# PDF-отчёты формируются в Celery (PdfJob); False — прямо в запросе, как раньше
+PDF_ASYNC = config('PDF_ASYNC', default=True, cast=bool)
+# сколько хранится готовый файл PDF-задания, сек
+PDF_JOB_TTL = config('PDF_JOB_TTL', default=24 * 60 * 60, cast=int)
+# через сколько секунд взятое задание считается брошенным — больше самого долгого рендера
+PDF_JOB_STALE = config('PDF_JOB_STALE', default=30 * 60, cast=int)
+# сколько раз брошенное PDF-задание перезапускается, прежде чем считаться упавшим
+PDF_JOB_MAX_ATTEMPTS = config('PDF_JOB_MAX_ATTEMPTS', default=3, cast=int)
+# от скольких выбранных единиц PDF этикеток формируется в Celery, а не в запросе
+PDF_LABELS_ASYNC_FROM = config('PDF_LABELS_ASYNC_FROM', default=200, cast=int)
+# от скольких строк список в PDF рендерится по частям в пуле процессов
+PDF_PARALLEL_THRESHOLD = config('PDF_PARALLEL_THRESHOLD', default=2000, cast=int)
+PDF_CHUNK_ROWS = config('PDF_CHUNK_ROWS', default=500, cast=int)
+# процессов в пуле; 0 — по числу ядер
+PDF_WORKERS = config('PDF_WORKERS', default=0, cast=int)
+# PDF-задания — в отдельную очередь: её воркер (--pool=threads) может запускать пул процессов
+CELERY_TASK_ROUTES = {
+    "apps.inventory.tasks.render_pdf_job": {"queue": "pdf"},
+}
+
+# CSS (пути в статике), которые рендерер PDF разбирает один раз и подключает ко всем PDF
+PDF_STYLESHEETS = ["assets/css/pdf/base.css"]
+
+# сколько браузер держит QR-картинку без перепроверки, сек (дальше — If-None-Match по ETag)
+QR_CACHE_MAX_AGE = config('QR_CACHE_MAX_AGE', default=30 * 24 * 60 * 60, cast=int)
+# сколько PNG QR живёт в общем кэше, сек (истекает и у удалённого оборудования)
+QR_CACHE_TIMEOUT = config('QR_CACHE_TIMEOUT', default=7 * 24 * 60 * 60, cast=int)
+# процессов для кодирования QR при выгрузке архива (пул на каждую выгрузку, не больше числа ядер);
+# 1 — без пула, в процессе запроса
+QR_ARCHIVE_WORKERS = config('QR_ARCHIVE_WORKERS', default=2, cast=int)
+
+# сетевой термопринтер этикеток (raw TCP); пустой хост — отправка на принтер выключена
+LABEL_PRINTER_HOST = config('LABEL_PRINTER_HOST', default='')
+LABEL_PRINTER_PORT = config('LABEL_PRINTER_PORT', default=9100, cast=int)
+# zpl или escpos
+LABEL_PRINTER_PROTOCOL = config('LABEL_PRINTER_PROTOCOL', default='zpl')
+LABEL_PRINTER_TIMEOUT = config('LABEL_PRINTER_TIMEOUT', default=10, cast=int)
+# шрифт ZPL с кириллицей (файл на принтере, ^A@); пусто — E:TT0003M_.TTF
+LABEL_ZPL_FONT = config('LABEL_ZPL_FONT', default='')
+
+# импорт CSV: строк в одной транзакции / пачке bulk_create
+IMPORT_CHUNK_SIZE = config('IMPORT_CHUNK_SIZE', default=1000, cast=int)
+
+
+# импорт CSV в Celery (ImportJob); False — прямо в запросе, как раньше
+IMPORT_ASYNC = config('IMPORT_ASYNC', default=True, cast=bool)
+# через сколько секунд без отметки о прогрессе задание импорта считается брошенным
+IMPORT_JOB_STALE = config('IMPORT_JOB_STALE', default=5 * 60, cast=int)
+# сколько хранятся завершённые задания импорта с файлами, сек
+IMPORT_JOB_TTL = config('IMPORT_JOB_TTL', default=7 * 24 * 60 * 60, cast=int)
+# сколько раз брошенное задание импорта перезапускается, прежде чем считаться упавшим
+IMPORT_JOB_MAX_ATTEMPTS = config('IMPORT_JOB_MAX_ATTEMPTS', default=3, cast=int)
+# сколько ошибок по строкам хранится в задании импорта (счётчик — все)
+IMPORT_JOB_MAX_ERRORS = config('IMPORT_JOB_MAX_ERRORS', default=500, cast=int)
+
+# проверка CSV без записи: процессов пула (0 — по числу CPU)
+IMPORT_VALIDATE_WORKERS = config('IMPORT_VALIDATE_WORKERS', default=0, cast=int)
+# с какого числа строк подключается пул (запуск процессов дороже проверки небольшого файла)
+IMPORT_VALIDATE_PARALLEL_ROWS = config('IMPORT_VALIDATE_PARALLEL_ROWS', default=20000, cast=int)
@@ -0,0 +1,82 @@
+// TomSelect с подгрузкой вариантов для select[data-remote-url] (config/widgets.py: RemoteSelect).
+// Варианты грузятся страницами (?q=&offset=&limit=) по мере прокрутки — плагин virtual_scroll.
+(function () {
+    function readFacets() {
+        const el = document.getElementById("list-facets");
+        return el ? JSON.parse(el.textContent || "{}") : {};
+    }
+
+    function init(el, facetsData) {
+        if (el.tomselect) return;
+
+        // убираем конфликты Bootstrap + TomSelect
+        el.classList.remove("form-select", "form-control");
+
+        const parent = el.dataset.remoteDepends ? document.getElementById(el.dataset.remoteDepends) : null;
+        const requireParent = !!el.dataset.remoteRequireParent;
+        const current = el.value;
+        const facets = el.dataset.facet ? (facetsData[el.dataset.facet] || {}) : null;
+
+        function urlFor(query, offset) {
+            const url = new URL(el.dataset.remoteUrl, window.location.origin);
+            url.searchParams.set("q", query || "");
+            url.searchParams.set("offset", offset || 0);
+            if (parent && parent.value) url.searchParams.set(el.dataset.remoteParam, parent.value);
+            if (current) url.searchParams.set("current", current);
+            return url.toString();
+        }
+
+        function label(item, escape) {
+            let html = escape(item.name);
+            if (facets && item.id) html += ` <span class="text-muted">(${facets[item.id] || 0})</span>`;
+            if (item.department) html += ` <span class="text-muted">(${escape(item.department)})</span>`;
+            return `<div>${html}</div>`;
+        }
+
+        const ts = new TomSelect(el, {
+            plugins: ["virtual_scroll"],
+            create: false,
+            allowEmptyOption: true,
+            placeholder: el.dataset.placeholder || "",
+            valueField: "id",
+            labelField: "name",
+            searchField: ["name", "department"],
+            maxOptions: null,
+            preload: "focus",
+            firstUrl: query => urlFor(query, 0),
+            load: function (query, callback) {
+                if (requireParent && !(parent && parent.value)) return callback();
+
+                fetch(this.getUrl(query), {headers: {"X-Requested-With": "XMLHttpRequest"}})
+                    .then(r => r.json())
+                    .then(data => {
+                        if (data && data.has_more) this.setNextUrl(query, urlFor(query, data.next_offset));
+                        callback((data && data.results) ? data.results : []);
+                    })
+                    .catch(() => callback());
+            },
+            render: {
+                option: label,
+                item: label,
+                loading_more: () => `<div class="loading-more-results py-2 d-flex align-items-center"><div class="spinner"></div> Загрузка…</div>`,
+                no_more_results: () => "",
+                no_results: () => `<div class="no-results">Ничего не найдено</div>`,
+            }
+        });
+
+        // смена родителя — прежний выбор и загруженные варианты больше не подходят
+        if (parent) {
+            parent.addEventListener("change", () => {
+                ts.clear(true);
+                ts.clearOptions();
+                ts.clearPagination();
+            });
+        }
+    }
+
+    document.addEventListener("DOMContentLoaded", () => {
+        if (typeof TomSelect === "undefined") return;
+        const facets = readFacets();
+        document.querySelectorAll("select[data-remote-url]").forEach(el => init(el, facets));
+    });
+})();
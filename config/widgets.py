@@ -0,0 +1,77 @@
+from django import forms
+from django.forms.models import ModelChoiceIterator
+from django.http import JsonResponse
+
+REMOTE_SELECT_LIMIT = 50
+REMOTE_SELECT_MAX_LIMIT = 200
+
+
+class RemoteSelect(forms.Select):
+    """
+    Select для ModelChoiceField с подгрузкой вариантов по AJAX (tom-select, remote-select.js).
+    В HTML попадают только пустой вариант и выбранное значение, а не весь queryset;
+    проверка на сервере остаётся обычной — ModelChoiceField ищет только присланный pk.
+
+    depends_on — id другого select, значение которого уходит в запрос параметром depends_param.
+    """
+
+    def __init__(self, url, *, depends_on=None, depends_param=None, require_parent=False,
+                 placeholder="", attrs=None):
+        attrs = dict(attrs or {})
+        attrs["data-remote-url"] = url
+        if depends_on:
+            attrs["data-remote-depends"] = depends_on
+            attrs["data-remote-param"] = depends_param or "parent_id"
+            if require_parent:
+                attrs["data-remote-require-parent"] = "1"
+        if placeholder:
+            attrs["data-placeholder"] = placeholder
+        super().__init__(attrs=attrs)
+
+    def optgroups(self, name, value, attrs=None):
+        choices = self.choices
+        if not isinstance(choices, ModelChoiceIterator):
+            return super().optgroups(name, value, attrs)
+
+        field = choices.field
+        limited = []
+        if field.empty_label is not None:
+            limited.append(("", field.empty_label))
+
+        selected = [v for v in value if v not in (None, "")]
+        if selected:
+            key = field.to_field_name or "pk"
+            try:
+                objects = list(field.queryset.filter(**{f"{key}__in": selected}))
+            except (ValueError, TypeError):
+                objects = []
+            limited.extend(choices.choice(obj) for obj in objects)
+
+        self.choices = limited
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = choices
+
+
+def remote_select_response(request, queryset, serialize):
+    """
+    Ответ для RemoteSelect: страница queryset по ?limit=&offset=,
+    {"results": [...], "has_more": bool, "next_offset": int}.
+    Лишняя строка выборки вместо COUNT(*) показывает, есть ли продолжение.
+    """
+    try:
+        limit = int(request.GET.get("limit") or REMOTE_SELECT_LIMIT)
+        offset = int(request.GET.get("offset") or 0)
+    except ValueError:
+        limit, offset = REMOTE_SELECT_LIMIT, 0
+    limit = max(1, min(limit, REMOTE_SELECT_MAX_LIMIT))
+    offset = max(0, offset)
+
+    rows = list(queryset[offset: offset + limit + 1])
+    has_more = len(rows) > limit
+    return JsonResponse({
+        "results": [serialize(obj) for obj in rows[:limit]],
+        "has_more": has_more,
+        "next_offset": offset + limit,
+    })